@@ -0,0 +1,535 @@
+"""
+HTTP API Server for GovGrant Assist
+Exposes ingestion, search, chat and proposal generation over HTTP so other
+systems (and a thin Streamlit client) can use the RAG backend
+
+Usage:
+    python api_server.py [--host 0.0.0.0] [--port 8000]
+
+Endpoints:
+    GET  /health
+    POST /documents                       Raw PDF body (?filename=guide.pdf,
+                                          &base=<document_id> for a revision)
+    GET  /documents/{document_id}
+    POST /documents/{document_id}/search   {"query", "k"}
+    POST /documents/{document_id}/chat     {"query", "history", "stream"}
+    POST /documents/{document_id}/proposal {"company_name", "project_title",
+                                            "core_solution", "requested_budget",
+                                            "sectioned"}
+    POST /library/search                   {"query", "k"} across every loaded
+                                          document (SHARDED_RETRIEVAL only)
+
+Documents are addressed by the SHA-256 digest of their bytes. Blocking
+LangChain calls run on a bounded worker pool and every request is subject to
+Config.API_REQUEST_TIMEOUT. An upload still ingesting when the timeout
+expires gets 202 {"status": "processing"}; ingestion continues and
+GET /documents/{document_id} reports processing, failed or ready.
+"""
+import argparse
+import asyncio
+import io
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+from clients import warm_up
+from config import Config
+from rag_engine import RAGEngine
+from faq import precompute_faq
+from llm_service import LLMService
+from memory_manager import get_memory_manager, track
+from sharded_index import ShardedIndex
+from utils.digest import compute_digest
+from utils.rate_limiter import RateLimitTimeout, queue_depths
+from utils.validators import FileValidator, FormValidator
+
+
+# Upper bound on "k" for search requests
+MAX_RESULTS = 50
+
+
+class IngestedDocument:
+    """An ingested guide and the services bound to it"""
+
+    def __init__(self, document_id: str, rag_engine: RAGEngine, stats: dict):
+        self.document_id = document_id
+        self.rag_engine = rag_engine
+        self.llm_service = LLMService(rag_engine, raise_errors=True)
+        self.stats = stats
+
+
+class DocumentRegistry:
+    """
+    Digest-addressed store of ingested documents
+    Keeps at most `capacity` documents (least recently used are evicted) and
+    coalesces concurrent uploads of the same bytes into one ingestion.
+    Ingestion runs to completion even if the uploading request times out, so
+    the client can poll for the result instead of uploading again. The
+    library (if any) mirrors the registry: evicted documents, and the base of
+    an uploaded revision, are removed from it.
+    """
+
+    def __init__(self, capacity: int, library: Optional[ShardedIndex] = None):
+        self.capacity = capacity
+        self.library = library
+        self._documents: "OrderedDict[str, IngestedDocument]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._failures: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, document_id: str) -> Optional[IngestedDocument]:
+        document = self._documents.get(document_id)
+        if document is not None:
+            self._documents.move_to_end(document_id)
+        return document
+
+    def is_processing(self, document_id: str) -> bool:
+        """True while the document is being ingested"""
+        return document_id in self._inflight
+
+    def failure(self, document_id: str) -> Optional[str]:
+        """Error from the document's last failed ingestion, if any"""
+        return self._failures.get(document_id)
+
+    def submit(
+        self,
+        data: bytes,
+        filename: str,
+        executor: ThreadPoolExecutor,
+        base_document_id: Optional[str] = None
+    ) -> Tuple[str, "asyncio.Future[IngestedDocument]"]:
+        """
+        Start ingesting PDF bytes, reusing an existing or in-flight ingestion
+
+        Args:
+            data: Raw PDF bytes
+            filename: Original filename (used for citations)
+            executor: Worker pool the ingestion runs on
+            base_document_id: Previously ingested version to update
+                incrementally; the base document itself is left unchanged
+
+        Returns:
+            Tuple of (document_id, future resolving to the ingested document)
+        """
+        document_id = compute_digest(data)
+        loop = asyncio.get_running_loop()
+
+        existing = self.get(document_id)
+        if existing is not None:
+            future = loop.create_future()
+            future.set_result(existing)
+            return document_id, future
+
+        if document_id not in self._inflight:
+            self._failures.pop(document_id, None)
+            base = self.get(base_document_id) if base_document_id else None
+            task = loop.create_task(self._ingest(
+                document_id, data, filename, executor,
+                base.rag_engine if base else None, base_document_id if base else None
+            ))
+            # Failures are kept in _failures; don't log them as unretrieved
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[document_id] = task
+
+        return document_id, self._inflight[document_id]
+
+    async def _ingest(
+        self,
+        document_id: str,
+        data: bytes,
+        filename: str,
+        executor: ThreadPoolExecutor,
+        base_engine: Optional[RAGEngine],
+        base_document_id: Optional[str]
+    ) -> IngestedDocument:
+        loop = asyncio.get_running_loop()
+        try:
+            document = await loop.run_in_executor(
+                executor, _ingest_bytes, document_id, data, filename, base_engine
+            )
+        except Exception as e:
+            self._failures[document_id] = str(e)
+            while len(self._failures) > self.capacity:
+                self._failures.popitem(last=False)
+            del self._inflight[document_id]
+            raise
+
+        self._documents[document_id] = document
+        evicted = []
+        while len(self._documents) > self.capacity:
+            evicted.append(self._documents.popitem(last=False)[0])
+        del self._inflight[document_id]
+
+        if self.library is not None:
+            # A revision supersedes its base in library search
+            if base_document_id is not None and base_document_id != document_id:
+                evicted.append(base_document_id)
+            try:
+                await loop.run_in_executor(executor, self.library.add_engine, document_id, document.rag_engine)
+                for evicted_id in evicted:
+                    await loop.run_in_executor(executor, self.library.remove_document, evicted_id)
+            except Exception:
+                pass  # Recorded on the failing shards and reported by /health
+
+        if Config.FAQ_ENABLED:
+            # Answer standard questions in the background, off the request workers
+            loop.run_in_executor(None, precompute_faq, document.rag_engine, f"faq:{document_id[:12]}")
+        return document
+
+
+def _ingest_bytes(
+    document_id: str,
+    data: bytes,
+    filename: str,
+    base_engine: Optional[RAGEngine] = None
+) -> IngestedDocument:
+    """Validate and ingest a PDF (or a revision of base_engine's) on a worker thread"""
+    file_buffer = io.BytesIO(data)
+    file_buffer.name = filename
+
+    is_valid, error_msg = FileValidator.validate_pdf(file_buffer, Config.MAX_FILE_SIZE_BYTES)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    if base_engine is not None:
+        rag_engine = base_engine.clone()
+        stats = rag_engine.reingest_document(file_buffer)
+    else:
+        rag_engine = RAGEngine()
+        stats = rag_engine.ingest_document(file_buffer)
+    track(rag_engine)
+    return IngestedDocument(document_id, rag_engine, stats)
+
+
+def _json_error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+class APIServer:
+    """aiohttp application wrapping RAGEngine and LLMService"""
+
+    def __init__(
+        self,
+        workers: int = Config.API_WORKERS,
+        request_timeout: float = Config.API_REQUEST_TIMEOUT,
+        max_documents: int = Config.API_MAX_DOCUMENTS,
+        api_token: Optional[str] = Config.API_TOKEN
+    ):
+        self.request_timeout = request_timeout
+        self.api_token = api_token
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        # Holds the documents currently in the registry, for cross-document search
+        self.library = ShardedIndex() if Config.SHARDED_RETRIEVAL else None
+        self.registry = DocumentRegistry(max_documents, self.library)
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking callable on the worker pool, bounded by the request timeout"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(self.executor, func, *args),
+            timeout=self.request_timeout
+        )
+
+    def build_app(self) -> web.Application:
+        app = web.Application(
+            middlewares=[self._error_middleware, self._auth_middleware],
+            client_max_size=Config.MAX_FILE_SIZE_BYTES + 1024
+        )
+        app.router.add_get("/health", self.health)
+        app.router.add_post("/documents", self.ingest)
+        app.router.add_get("/documents/{document_id}", self.document_info)
+        app.router.add_post("/documents/{document_id}/search", self.search)
+        app.router.add_post("/documents/{document_id}/chat", self.chat)
+        app.router.add_post("/documents/{document_id}/proposal", self.proposal)
+        app.router.add_post("/library/search", self.library_search)
+        app.on_cleanup.append(self._shutdown)
+        return app
+
+    async def _shutdown(self, app: web.Application):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.library is not None:
+            self.library.close()
+
+    @web.middleware
+    async def _auth_middleware(self, request: web.Request, handler):
+        if self.api_token and request.path != "/health":
+            if request.headers.get("Authorization") != f"Bearer {self.api_token}":
+                return _json_error(401, "Missing or invalid API token.")
+        return await handler(request)
+
+    @web.middleware
+    async def _error_middleware(self, request: web.Request, handler):
+        try:
+            return await handler(request)
+        except web.HTTPException:
+            raise
+        except RateLimitTimeout as e:
+            return _json_error(429, str(e))
+        except asyncio.TimeoutError:
+            return _json_error(504, f"Request exceeded {self.request_timeout:g}s timeout.")
+        except ValueError as e:
+            return _json_error(400, str(e))
+        except Exception as e:
+            return _json_error(500, str(e))
+
+    def _get_document(self, request: web.Request) -> IngestedDocument:
+        document_id = request.match_info["document_id"]
+        document = self.registry.get(document_id)
+        if document is None and self.registry.is_processing(document_id):
+            raise web.HTTPConflict(
+                text=json.dumps({"error": "Document is still being ingested. Poll /documents/{document_id}."}),
+                content_type="application/json"
+            )
+        if document is None:
+            raise web.HTTPNotFound(
+                text=json.dumps({"error": "Unknown document. Upload it to /documents first."}),
+                content_type="application/json"
+            )
+        return document
+
+    async def _read_json(self, request: web.Request) -> dict:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise ValueError("Request body must be valid JSON.")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return body
+
+    def _read_history(self, body: dict) -> list:
+        """Validated chat history: a list of {"role", "content"} objects"""
+        history = body.get("history") or []
+        if not isinstance(history, list) or not all(
+            isinstance(message, dict)
+            and message.get("role") in ("user", "assistant")
+            and isinstance(message.get("content"), str)
+            for message in history
+        ):
+            raise ValueError('history must be a list of {"role": "user" | "assistant", "content": string} objects.')
+        return history
+
+    def _read_k(self, body: dict) -> int:
+        """Validated result count from a request body (Config.TOP_K_RESULTS if absent)"""
+        k = body.get("k")
+        if k is None:
+            return Config.TOP_K_RESULTS
+        if isinstance(k, bool) or not isinstance(k, int):
+            raise ValueError("k must be an integer.")
+        if not 1 <= k <= MAX_RESULTS:
+            raise ValueError(f"k must be between 1 and {MAX_RESULTS}.")
+        return k
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "provider": Config.LLM_PROVIDER,
+            "queue_depth": queue_depths(),
+            "index_memory": get_memory_manager().stats(),
+            "library": self.library.health() if self.library is not None else None,
+        })
+
+    async def ingest(self, request: web.Request) -> web.Response:
+        data = await request.read()
+        if not data:
+            raise ValueError("File is empty.")
+
+        filename = request.query.get("filename", "document.pdf")
+        base_document_id = request.query.get("base")
+        if base_document_id and self.registry.get(base_document_id) is None:
+            return _json_error(404, f"Base document not found: {base_document_id}")
+
+        document_id, ingestion = self.registry.submit(data, filename, self.executor, base_document_id)
+        try:
+            document = await asyncio.wait_for(asyncio.shield(ingestion), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            # Ingestion carries on; the client polls GET /documents/{document_id}
+            return web.json_response({"document_id": document_id, "status": "processing"}, status=202)
+        return web.json_response({"document_id": document.document_id, "status": "ready", **document.stats})
+
+    async def document_info(self, request: web.Request) -> web.Response:
+        document_id = request.match_info["document_id"]
+        if self.registry.is_processing(document_id):
+            return web.json_response({"document_id": document_id, "status": "processing"}, status=202)
+        error = self.registry.failure(document_id)
+        if error is not None and self.registry.get(document_id) is None:
+            return web.json_response({"document_id": document_id, "status": "failed", "error": error}, status=422)
+
+        document = self._get_document(request)
+        faq = document.rag_engine.faq
+        return web.json_response({
+            "document_id": document.document_id,
+            "status": "ready",
+            **document.stats,
+            "suggested_questions": faq.suggestions() if faq is not None else [],
+        })
+
+    async def search(self, request: web.Request) -> web.Response:
+        document = self._get_document(request)
+        body = await self._read_json(request)
+
+        query = str(body.get("query") or "").strip()
+        if not query:
+            raise ValueError("query is required.")
+        k = self._read_k(body)
+
+        results = await self.run_blocking(document.rag_engine.similarity_search, query, k)
+        return web.json_response({
+            "results": [
+                {
+                    "content": doc.page_content,
+                    "page": doc.metadata.get("page"),
+                    "chunk_id": doc.metadata.get("chunk_id"),
+                    "score": float(score),
+                }
+                for doc, score in results
+            ]
+        })
+
+    async def library_search(self, request: web.Request) -> web.Response:
+        if self.library is None:
+            return _json_error(404, "Library search is disabled. Set SHARDED_RETRIEVAL=true.")
+        body = await self._read_json(request)
+
+        query = str(body.get("query") or "").strip()
+        if not query:
+            raise ValueError("query is required.")
+        k = self._read_k(body)
+
+        results = await self.run_blocking(self.library.search, query, k)
+        return web.json_response({
+            "results": [
+                {
+                    "document_id": doc.metadata.get("document_id"),
+                    "source": doc.metadata.get("source"),
+                    "content": doc.page_content,
+                    "page": doc.metadata.get("page"),
+                    "chunk_id": doc.metadata.get("chunk_id"),
+                    "score": float(score),
+                }
+                for doc, score in results
+            ]
+        })
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        document = self._get_document(request)
+        body = await self._read_json(request)
+
+        query = str(body.get("query") or "").strip()
+        if not query:
+            raise ValueError("query is required.")
+        history = self._read_history(body)
+
+        if not body.get("stream"):
+            try:
+                answer = await self.run_blocking(document.llm_service.chat, query, history)
+            except (RateLimitTimeout, asyncio.TimeoutError):
+                raise  # 429 / 504 from _error_middleware
+            except Exception as e:
+                return _json_error(502, f"❌ Error generating response: {e}")
+            return web.json_response({"answer": answer})
+
+        return await self._stream_chat(request, document, query, history)
+
+    async def _stream_chat(
+        self,
+        request: web.Request,
+        document: IngestedDocument,
+        query: str,
+        history: list
+    ) -> web.StreamResponse:
+        """Relay stream_chat() fragments to the client as server-sent events"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for fragment in document.llm_service.stream_chat(query, history):
+                    loop.call_soon_threadsafe(queue.put_nowait, fragment)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        deadline = loop.time() + self.request_timeout
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                if item is done:
+                    await response.write(b"event: done\ndata: {}\n\n")
+                    break
+                if isinstance(item, Exception):
+                    # Headers are already sent, so the status goes in the event
+                    status = 429 if isinstance(item, RateLimitTimeout) else 502
+                    await self._write_event(response, "error", {"error": str(item), "status": status})
+                    break
+                await response.write(f"data: {json.dumps({'delta': item})}\n\n".encode("utf-8"))
+        except asyncio.TimeoutError:
+            message = f"Request exceeded {self.request_timeout:g}s timeout."
+            await self._write_event(response, "error", {"error": message, "status": 504})
+        finally:
+            producer.cancel()
+
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def _write_event(response: web.StreamResponse, event: str, data: dict):
+        await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    async def proposal(self, request: web.Request) -> web.Response:
+        document = self._get_document(request)
+        body = await self._read_json(request)
+
+        company_name = str(body.get("company_name") or "")
+        project_title = str(body.get("project_title") or "")
+        core_solution = str(body.get("core_solution") or "")
+        requested_budget = body.get("requested_budget")
+
+        errors = FormValidator.validate_proposal_form(
+            company_name, project_title, core_solution, requested_budget
+        )
+        if errors:
+            return web.json_response({"errors": errors}, status=422)
+
+        proposal = await self.run_blocking(
+            lambda: document.llm_service.generate_proposal(
+                company_name=company_name,
+                project_title=project_title,
+                core_solution=core_solution,
+                requested_budget=float(requested_budget) if requested_budget else None,
+                sectioned=body.get("sectioned")
+            )
+        )
+
+        if proposal.startswith("❌"):
+            return _json_error(502, proposal)
+        return web.json_response({"proposal": proposal})
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Run the GovGrant Assist HTTP API.")
+    parser.add_argument("--host", default=Config.API_HOST)
+    parser.add_argument("--port", type=int, default=Config.API_PORT)
+    args = parser.parse_args()
+
+    Config.validate()
+    warm_up()
+    web.run_app(APIServer().build_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,16 @@ RAG-powered Government Grant Assistant
 Implements PRD specifications for UI, authentication, and workflows
 Version: 1.0.0 - Updated with LangChain v1.x compatibility
 """
+import time
+import uuid
 import streamlit as st
 from datetime import datetime
+from clients import warm_up
 from config import Config
-from rag_engine import RAGEngine
 from llm_service import LLMService
+from ingest_jobs import IngestJob, get_job_manager
+from utils.digest import file_digest
+from utils.rate_limiter import queue_depths
 from utils.validators import FileValidator, FormValidator
 
 
@@ -27,6 +32,9 @@ def init_session_state():
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
 
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
     if 'rag_engine' not in st.session_state:
         st.session_state.rag_engine = None
 
@@ -45,6 +53,17 @@ def init_session_state():
     if 'generated_proposal' not in st.session_state:
         st.session_state.generated_proposal = None
 
+    if 'pending_document' not in st.session_state:
+        st.session_state.pending_document = None
+
+    if 'failed_document' not in st.session_state:
+        st.session_state.failed_document = None
+
+    # (file_id, is_valid, error_msg, digest) of the current upload, so reruns
+    # while a job is polled don't re-validate and re-hash the file
+    if 'upload_check' not in st.session_state:
+        st.session_state.upload_check = None
+
 
 def authenticate():
     """
@@ -108,46 +127,88 @@ def render_sidebar():
             label_visibility="collapsed"
         )
 
-        if uploaded_file is not None:
-            # Validate file
-            is_valid, error_msg = FileValidator.validate_pdf(
-                uploaded_file,
-                Config.MAX_FILE_SIZE_BYTES
-            )
+        # A revised guide only re-embeds what changed since the loaded one
+        is_revision = st.session_state.document_loaded and st.checkbox(
+            "Upload is a revised version of the loaded guide",
+            value=False,
+            help="Only chunks that changed are re-embedded; unchanged ones keep their vectors"
+        )
+
+        if uploaded_file is None:
+            # Removing the file clears a failure, so re-uploading it resubmits
+            st.session_state.failed_document = None
+
+        else:
+            # Validate and hash each upload once
+            check = st.session_state.upload_check
+            if check is None or check[0] != uploaded_file.file_id:
+                is_valid, error_msg = FileValidator.validate_pdf(
+                    uploaded_file,
+                    Config.MAX_FILE_SIZE_BYTES
+                )
+                file_hash = file_digest(uploaded_file) if is_valid else None
+                check = (uploaded_file.file_id, is_valid, error_msg, file_hash)
+                st.session_state.upload_check = check
+            _, is_valid, error_msg, file_hash = check
 
             if not is_valid:
                 st.error(f"❌ {error_msg}")
                 return
 
             # Check if this is a new file
-            file_hash = hash(uploaded_file.name + str(uploaded_file.size))
             current_hash = st.session_state.get('document_hash')
 
-            if file_hash != current_hash:
-                # New document - process it
-                with st.spinner("🔄 Processing document... This may take a moment."):
-                    try:
-                        # Initialize RAG engine if needed
-                        if st.session_state.rag_engine is None:
-                            st.session_state.rag_engine = RAGEngine()
+            failed = st.session_state.failed_document
+            if failed and failed[0] == file_hash:
+                # Don't resubmit a document that just failed; show why and let
+                # the user retry (failures may be transient, e.g. rate limits)
+                st.error(f"❌ Error processing document: {failed[1]}")
+                if st.button("🔁 Retry", use_container_width=True):
+                    st.session_state.failed_document = None
+                    st.rerun()
+
+            elif file_hash != current_hash and file_hash != st.session_state.pending_document:
+                # New document - hand it to the background ingestion workers
+                get_job_manager().submit(
+                    uploaded_file,
+                    document_id=file_hash,
+                    base_document_id=current_hash if is_revision else None
+                )
+                st.session_state.pending_document = file_hash
 
-                        # Ingest document
-                        stats = st.session_state.rag_engine.ingest_document(uploaded_file)
+        # Poll the background ingestion job, attaching to its result when ready
+        if st.session_state.pending_document:
+            job = get_job_manager().get(st.session_state.pending_document)
 
-                        # Initialize LLM service
-                        st.session_state.llm_service = LLMService(st.session_state.rag_engine)
+            if job is None:
+                # Job evicted before this session attached; allow a re-upload
+                st.session_state.pending_document = None
 
-                        # Update state
-                        st.session_state.document_loaded = True
-                        st.session_state.document_info = stats
-                        st.session_state.document_hash = file_hash
-                        st.session_state.messages = []  # Clear chat history
+            elif job.is_active:
+                # main() reruns the script until the job finishes
+                st.progress(job.progress, text=f"🔄 Processing document... {job.message}")
 
-                        st.success("✅ Document processed successfully!")
+            elif job.status == IngestJob.DONE:
+                st.session_state.rag_engine = job.rag_engine
+                st.session_state.llm_service = LLMService(
+                    job.rag_engine,
+                    session_id=st.session_state.session_id
+                )
 
-                    except Exception as e:
-                        st.error(f"❌ Error processing document: {str(e)}")
-                        st.session_state.document_loaded = False
+                # Update state
+                st.session_state.document_loaded = True
+                st.session_state.document_info = job.stats
+                st.session_state.document_hash = job.document_id
+                st.session_state.pending_document = None
+                st.session_state.messages = []  # Clear chat history
+
+                st.success("✅ Document processed successfully!")
+
+            else:
+                st.error(f"❌ Error processing document: {job.error}")
+                st.session_state.document_loaded = False
+                st.session_state.pending_document = None
+                st.session_state.failed_document = (job.document_id, job.error)
 
         # Display document info if loaded
         if st.session_state.document_loaded and st.session_state.document_info:
@@ -157,6 +218,17 @@ def render_sidebar():
             info = st.session_state.document_info
             st.metric("Pages", info['total_pages'])
             st.metric("Chunks", info['total_chunks'])
+            if info.get('duplicate_chunks_removed'):
+                st.caption(f"Skipped {info['duplicate_chunks_removed']} duplicate chunks")
+            if info.get('changes'):
+                changes = info['changes']
+                changed_pages = ", ".join(str(page) for page in changes['changed_pages']) or "none"
+                st.caption(
+                    f"Revision: pages changed: {changed_pages}; "
+                    f"{changes['pages_added']} added, {changes['pages_removed']} removed. "
+                    f"Re-embedded {changes['chunks_added']} chunks, reused {changes['chunks_reused']}, "
+                    f"dropped {changes['chunks_removed']}."
+                )
             st.caption(f"**File:** {info['filename']}")
 
         # Configuration section
@@ -169,6 +241,10 @@ def render_sidebar():
         st.caption(f"**LLM Provider:** {provider}")
         st.caption(f"**Model:** {model}")
 
+        if Config.RATE_LIMIT_ENABLED:
+            waiting = sum(queue_depths().values())
+            st.caption(f"**Provider Queue:** {waiting} request(s) waiting")
+
         # Logout button
         st.divider()
         if st.button("🚪 Logout", type="secondary", use_container_width=True):
@@ -194,8 +270,19 @@ def render_chat_interface():
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
+    # Suggested questions, answered in advance when the document was ingested
+    suggested = None
+    faq = st.session_state.rag_engine.faq
+    if faq is not None and faq.is_ready and not st.session_state.messages:
+        st.caption("Suggested questions")
+        columns = st.columns(min(3, len(faq.suggestions())))
+        for i, question in enumerate(faq.suggestions()):
+            if columns[i % len(columns)].button(question, key=f"faq_{i}", use_container_width=True):
+                suggested = question
+
     # Chat input
-    if prompt := st.chat_input("Ask about grant requirements, eligibility, deadlines, etc."):
+    prompt = st.chat_input("Ask about grant requirements, eligibility, deadlines, etc.") or suggested
+    if prompt:
         # Add user message
         st.session_state.messages.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
@@ -357,6 +444,9 @@ def main():
         st.info("Please set up your API keys in the `.env` file.")
         st.stop()
 
+    # Build shared provider clients and open pooled connections (once per process)
+    warm_up()
+
     # Authentication check
     if not st.session_state.authenticated:
         authenticate()
@@ -392,6 +482,11 @@ Always consult with qualified professionals for accurate and personalized advice
     st.divider()
     st.caption("⚠️ **Privacy Notice:** All uploaded documents and generated content are stored temporarily in your browser session and will be cleared when you close this tab.")
 
+    # Poll while a background ingestion is in flight
+    if st.session_state.pending_document:
+        time.sleep(Config.INGEST_POLL_INTERVAL)
+        st.rerun()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,356 @@
+"""
+Batch Proposal Generator for GovGrant Assist
+Headless entry point: ingest one grant guide, generate many proposals
+
+Usage:
+    python batch_generate.py GUIDE.pdf projects.csv results.jsonl
+    python batch_generate.py GUIDE.pdf projects.jsonl results.jsonl --concurrency 8
+
+Input rows need company_name, project_title and core_solution columns/keys,
+plus optional requested_budget and id. Results are appended to the output
+JSONL as each proposal finishes, so a rerun skips items already generated.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from config import Config
+from rag_engine import RAGEngine
+from llm_service import LLMService
+from utils.validators import FileValidator, FormValidator
+
+
+REQUIRED_FIELDS = ("company_name", "project_title", "core_solution")
+
+_SAFE_FILENAME = re.compile(r"[\w.-]+")
+
+
+def read_projects(path: str) -> Iterator[Dict]:
+    """
+    Read project rows from a CSV or JSONL file
+
+    Args:
+        path: Path to a .csv or .jsonl file
+
+    Yields:
+        One dict per project
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_num, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_num} of {path}: {e}")
+
+
+def project_id(project: Dict) -> str:
+    """Stable identifier for a project: explicit id, else a digest of its fields"""
+    if not isinstance(project, dict):
+        key = json.dumps(project, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    if project.get("id"):
+        return str(project["id"])
+
+    key = "\x1f".join(str(project.get(field, "")).strip() for field in REQUIRED_FIELDS)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def markdown_filename(item_id: str) -> str:
+    """File name for a project's Markdown; ids unsafe as file names are hashed"""
+    if not _SAFE_FILENAME.fullmatch(item_id) or item_id.strip(".") == "":
+        item_id = hashlib.sha256(item_id.encode("utf-8")).hexdigest()[:16]
+    return f"{item_id}.md"
+
+
+def parse_budget(value) -> Optional[float]:
+    """Blank and zero budgets are treated as not provided, as in the form"""
+    if value is None or str(value).strip() == "":
+        return None
+    budget = float(str(value).replace(",", "").replace("$", ""))
+    return budget if budget != 0 else None
+
+
+def validate_project(project: Dict) -> Tuple[Optional[Dict], List[str]]:
+    """
+    Validate a project row with the same rules as the proposal form
+
+    Args:
+        project: Raw input row
+
+    Returns:
+        Tuple of (normalized_kwargs or None, error_messages)
+    """
+    if not isinstance(project, dict):
+        return None, ["Row must be a JSON object."]
+
+    company_name = str(project.get("company_name") or "")
+    project_title = str(project.get("project_title") or "")
+    core_solution = str(project.get("core_solution") or "")
+
+    try:
+        requested_budget = parse_budget(project.get("requested_budget"))
+    except ValueError:
+        return None, ["Budget must be a valid number."]
+
+    errors = FormValidator.validate_proposal_form(
+        company_name, project_title, core_solution, requested_budget
+    )
+    if errors:
+        return None, errors
+
+    return {
+        "company_name": company_name,
+        "project_title": project_title,
+        "core_solution": core_solution,
+        "requested_budget": requested_budget,
+    }, []
+
+
+def load_finished_ids(output_path: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Collect ids already recorded by a previous run
+
+    Args:
+        output_path: Results JSONL file
+
+    Returns:
+        Tuple of (ids generated successfully, ids recorded as invalid)
+    """
+    finished = set()
+    invalid = set()
+    if not os.path.exists(output_path):
+        return finished, invalid
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial line from an interrupted run
+            if record.get("status") == "ok":
+                finished.add(record["id"])
+            elif record.get("status") == "invalid":
+                invalid.add(record["id"])
+
+    return finished, invalid
+
+
+class ResultWriter:
+    """Thread-safe, append-only JSONL writer that flushes every record"""
+
+    def __init__(self, output_path: str):
+        self._lock = threading.Lock()
+        self._file = open(output_path, "a", encoding="utf-8")
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def generate_one(
+    llm_service: LLMService,
+    item_id: str,
+    kwargs: Dict,
+    sectioned: Optional[bool] = None
+) -> Dict:
+    """Generate a single proposal and wrap it as a result record"""
+    proposal = llm_service.generate_proposal(**kwargs, sectioned=sectioned)
+
+    # LLMService reports failures in-band rather than raising
+    if proposal.startswith("❌"):
+        return {"id": item_id, "status": "error", "error": proposal}
+
+    return {
+        "id": item_id,
+        "status": "ok",
+        "company_name": kwargs["company_name"],
+        "project_title": kwargs["project_title"],
+        "proposal": proposal,
+    }
+
+
+def run_batch(
+    guide_path: str,
+    projects_path: str,
+    output_path: str,
+    concurrency: int,
+    markdown_dir: Optional[str] = None,
+    sectioned: Optional[bool] = None
+) -> Dict:
+    """
+    Ingest the guide once and generate all pending proposals
+
+    Args:
+        guide_path: Grant guide PDF
+        projects_path: CSV or JSONL of projects
+        output_path: JSONL file results are appended to
+        concurrency: Maximum proposals generated at once
+        markdown_dir: Optional directory to also write each proposal as Markdown
+        sectioned: Force sectioned/single proposal mode (defaults to Config.PROPOSAL_MODE)
+
+    Returns:
+        Run summary counts
+    """
+    finished, recorded_invalid = load_finished_ids(output_path)
+
+    pending = []
+    invalid = []
+    seen = set()
+    summary = {
+        "skipped": 0,
+        "invalid": 0,
+        "generated": 0,
+        "failed": 0,
+    }
+    for project in read_projects(projects_path):
+        item_id = project_id(project)
+        if item_id in seen:
+            continue
+        seen.add(item_id)
+        if item_id in finished:
+            summary["skipped"] += 1
+            continue
+
+        # Rows are revalidated on every run (they may have been fixed), but
+        # an invalid row is only recorded in the output once
+        kwargs, errors = validate_project(project)
+        if errors:
+            summary["invalid"] += 1
+            if item_id not in recorded_invalid:
+                invalid.append({"id": item_id, "status": "invalid", "errors": errors})
+        else:
+            pending.append((item_id, kwargs))
+
+    writer = ResultWriter(output_path)
+    try:
+        for record in invalid:
+            writer.write(record)
+
+        if not pending:
+            return summary
+
+        with open(guide_path, "rb") as guide:
+            is_valid, error_msg = FileValidator.validate_pdf(guide, Config.MAX_FILE_SIZE_BYTES)
+            if not is_valid:
+                raise ValueError(f"{guide_path}: {error_msg}")
+
+            rag_engine = RAGEngine()
+            stats = rag_engine.ingest_document(guide)
+
+        print(
+            f"Ingested {stats['filename']}: {stats['total_pages']} pages, "
+            f"{stats['total_chunks']} chunks",
+            file=sys.stderr
+        )
+
+        llm_service = LLMService(rag_engine)
+
+        if markdown_dir:
+            os.makedirs(markdown_dir, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(generate_one, llm_service, item_id, kwargs, sectioned): item_id
+                for item_id, kwargs in pending
+            }
+
+            for future in as_completed(futures):
+                item_id = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"id": item_id, "status": "error", "error": str(e)}
+
+                writer.write(record)
+
+                if record["status"] == "ok":
+                    summary["generated"] += 1
+                    if markdown_dir:
+                        md_path = os.path.join(markdown_dir, markdown_filename(item_id))
+                        with open(md_path, "w", encoding="utf-8") as f:
+                            f.write(record["proposal"])
+                else:
+                    summary["failed"] += 1
+
+                done = summary["generated"] + summary["failed"]
+                print(f"[{done}/{len(pending)}] {item_id}: {record['status']}", file=sys.stderr)
+    finally:
+        writer.close()
+
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Generate grant proposals in bulk against one grant guide."
+    )
+    parser.add_argument("guide", help="Grant guide PDF")
+    parser.add_argument("projects", help="Projects file (.csv or .jsonl)")
+    parser.add_argument("output", help="Results file (.jsonl); rerunning resumes from it")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=Config.BATCH_CONCURRENCY,
+        help=f"Maximum concurrent LLM requests (default: {Config.BATCH_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--markdown-dir",
+        help="Also write each generated proposal to <dir>/<id>.md (ids unsafe as file names are hashed)"
+    )
+    parser.add_argument(
+        "--sectioned",
+        action="store_true",
+        default=None,
+        help="Generate proposal sections concurrently (overrides PROPOSAL_MODE)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    try:
+        Config.validate()
+        summary = run_batch(
+            args.guide,
+            args.projects,
+            args.output,
+            args.concurrency,
+            markdown_dir=args.markdown_dir,
+            sectioned=args.sectioned
+        )
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Done: {summary['generated']} generated, {summary['failed']} failed, "
+        f"{summary['invalid']} invalid, {summary['skipped']} already finished",
+        file=sys.stderr
+    )
+    return 0 if summary["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Shared LLM and Embedding Clients for GovGrant Assist
+Process-wide client singletons shared by every session and service
+
+Constructing ChatOpenAI/OpenAIEmbeddings per session gives each one its own
+HTTP connection pool, so every first request pays for client setup and a TLS
+handshake. Here OpenAI clients share one keep-alive httpx pool, each client is
+built once per process, and warm_up() opens connections ahead of traffic.
+
+When Config.RATE_LIMIT_ENABLED, every client is wrapped so its calls pass
+through the provider/model's admission controller (utils.rate_limiter).
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_community.embeddings import OpenAIEmbeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from config import Config
+from utils.rate_limiter import estimate_tokens, get_controller
+
+
+class AdmissionControlledChatModel:
+    """
+    Chat model proxy that waits for provider budget before every call
+    Attributes other than invoke/stream are delegated to the wrapped model
+    """
+
+    def __init__(self, model, controller):
+        self._model = model
+        self._controller = controller
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def _acquire(self, messages):
+        prompt = "".join(str(message.content) for message in messages)
+        self._controller.acquire(estimate_tokens(prompt) + Config.RATE_LIMIT_COMPLETION_TOKENS)
+
+    def invoke(self, messages, *args, **kwargs):
+        self._acquire(messages)
+        return self._model.invoke(messages, *args, **kwargs)
+
+    def stream(self, messages, *args, **kwargs):
+        self._acquire(messages)
+        return self._model.stream(messages, *args, **kwargs)
+
+
+class AdmissionControlledEmbeddings(Embeddings):
+    """Embeddings proxy that waits for provider budget before every call"""
+
+    def __init__(self, embeddings: Embeddings, controller):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self._controller = controller
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._controller.acquire(sum(estimate_tokens(text) for text in texts))
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._controller.acquire(estimate_tokens(text))
+        return self.embeddings.embed_query(text)
+
+
+def _chat_controller(provider: str, model: str):
+    return get_controller(
+        f"{provider}/{model}",
+        Config.RATE_LIMIT_RPM,
+        Config.RATE_LIMIT_TPM,
+        Config.RATE_LIMIT_MAX_WAIT
+    )
+
+
+def _embedding_controller(provider: str, model: str):
+    return get_controller(
+        f"{provider}/{model}",
+        Config.EMBEDDING_RATE_LIMIT_RPM,
+        Config.EMBEDDING_RATE_LIMIT_TPM,
+        Config.RATE_LIMIT_MAX_WAIT
+    )
+
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_chat_models: Dict[str, Any] = {}
+_embeddings: Dict[str, Embeddings] = {}
+_warmed = False
+
+
+def get_http_client() -> httpx.Client:
+    """Return the shared keep-alive HTTP client used by OpenAI clients"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=Config.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(Config.HTTP_TIMEOUT, connect=10.0)
+            )
+        return _http_client
+
+
+def get_chat_model(provider: str):
+    """
+    Return the shared chat model for a provider
+
+    Args:
+        provider: "openai" or "google"
+
+    Returns:
+        LangChain chat model (built on first use)
+    """
+    if provider not in ("openai", "google"):
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    http_client = get_http_client() if provider == "openai" else None
+    with _lock:
+        if provider not in _chat_models:
+            if provider == "openai":
+                _chat_models[provider] = ChatOpenAI(
+                    model=Config.OPENAI_MODEL,
+                    openai_api_key=Config.OPENAI_API_KEY,
+                    openai_api_base=Config.OPENAI_BASE_URL,
+                    http_client=http_client,
+                    temperature=0.3  # Lower temperature for factual compliance
+                )
+            else:
+                _chat_models[provider] = ChatGoogleGenerativeAI(
+                    model=Config.GOOGLE_MODEL,
+                    google_api_key=Config.GOOGLE_API_KEY,
+                    temperature=0.3
+                )
+
+            if Config.RATE_LIMIT_ENABLED:
+                model_name = Config.OPENAI_MODEL if provider == "openai" else Config.GOOGLE_MODEL
+                _chat_models[provider] = AdmissionControlledChatModel(
+                    _chat_models[provider],
+                    _chat_controller(provider, model_name)
+                )
+        return _chat_models[provider]
+
+
+def get_embeddings(provider: str) -> Embeddings:
+    """
+    Return the shared embeddings client for a provider
+
+    Args:
+        provider: "openai" or "google"
+
+    Returns:
+        LangChain embeddings (built on first use)
+    """
+    if provider not in ("openai", "google"):
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    http_client = get_http_client() if provider == "openai" else None
+    with _lock:
+        if provider not in _embeddings:
+            if provider == "openai":
+                # This OpenAIEmbeddings hands http_client to its async client
+                # too, which rejects a sync pool; build the SDK clients here
+                _embeddings[provider] = OpenAIEmbeddings(
+                    openai_api_key=Config.OPENAI_API_KEY,
+                    openai_api_base=Config.OPENAI_BASE_URL,
+                    client=openai.OpenAI(
+                        api_key=Config.OPENAI_API_KEY,
+                        base_url=Config.OPENAI_BASE_URL,
+                        http_client=http_client
+                    ).embeddings,
+                    async_client=openai.AsyncOpenAI(
+                        api_key=Config.OPENAI_API_KEY,
+                        base_url=Config.OPENAI_BASE_URL
+                    ).embeddings
+                )
+            else:
+                _embeddings[provider] = GoogleGenerativeAIEmbeddings(
+                    model="models/embedding-001",
+                    google_api_key=Config.GOOGLE_API_KEY
+                )
+
+            if Config.RATE_LIMIT_ENABLED:
+                embeddings = _embeddings[provider]
+                _embeddings[provider] = AdmissionControlledEmbeddings(
+                    embeddings,
+                    _embedding_controller(provider, getattr(embeddings, "model", "embeddings"))
+                )
+        return _embeddings[provider]
+
+
+def warm_up():
+    """
+    Build the configured provider's clients and open pooled connections
+    Safe to call repeatedly; only the first call does any work. Failures are
+    ignored so a cold network never blocks startup.
+    """
+    global _warmed
+    with _lock:
+        if _warmed:
+            return
+        _warmed = True
+
+    get_chat_model(Config.LLM_PROVIDER)
+    get_embeddings(Config.LLM_PROVIDER)
+
+    if Config.LLM_PROVIDER == "openai" and Config.OPENAI_API_KEY:
+        # Listing models is free and leaves TLS connections in the keep-alive pool
+        try:
+            get_http_client().get(
+                f"{Config.OPENAI_BASE_URL.rstrip('/')}/models",
+                headers={"Authorization": f"Bearer {Config.OPENAI_API_KEY}"}
+            )
+        except httpx.HTTPError:
+            pass
@@ -39,6 +39,51 @@ class Config:
     CHUNK_SIZE = int(get_secret("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP = int(get_secret("CHUNK_OVERLAP", "100"))
     TOP_K_RESULTS = int(get_secret("TOP_K_RESULTS", "3"))
+    EMBEDDING_BATCH_SIZE = int(get_secret("EMBEDDING_BATCH_SIZE", "64"))
+
+    # Pre-embedding cleanup: repeated header/footer lines and duplicate chunks
+    STRIP_BOILERPLATE = get_secret("STRIP_BOILERPLATE", "true").lower() == "true"
+    BOILERPLATE_MIN_PAGE_FRACTION = float(get_secret("BOILERPLATE_MIN_PAGE_FRACTION", "0.5"))
+    DEDUPLICATE_CHUNKS = get_secret("DEDUPLICATE_CHUNKS", "true").lower() == "true"
+    DEDUP_SIMILARITY_THRESHOLD = float(get_secret("DEDUP_SIMILARITY_THRESHOLD", "0.9"))
+
+    # Hierarchical (section -> chunk) index for long guides
+    HIERARCHICAL_INDEX = get_secret("HIERARCHICAL_INDEX", "true").lower() == "true"
+    HIERARCHY_TOP_SECTIONS = int(get_secret("HIERARCHY_TOP_SECTIONS", "3"))
+    HIERARCHY_MIN_CHUNKS = int(get_secret("HIERARCHY_MIN_CHUNKS", "1000"))  # Smaller guides are searched flat
+    SECTION_PAGE_WINDOW = int(get_secret("SECTION_PAGE_WINDOW", "10"))
+
+    # Background Ingestion
+    INGEST_WORKERS = int(get_secret("INGEST_WORKERS", "2"))
+    INGEST_JOB_RETENTION = int(get_secret("INGEST_JOB_RETENTION", "20"))
+    INGEST_POLL_INTERVAL = float(get_secret("INGEST_POLL_INTERVAL", "1.0"))
+
+    # Spill idle sessions' indexes to disk; reloaded on their next search
+    SPILL_ENABLED = get_secret("SPILL_ENABLED", "true").lower() == "true"
+    SPILL_IDLE_SECONDS = float(get_secret("SPILL_IDLE_SECONDS", "900"))
+    SPILL_MAX_RESIDENT_MB = float(get_secret("SPILL_MAX_RESIDENT_MB", "1024"))
+    SPILL_CHECK_INTERVAL = float(get_secret("SPILL_CHECK_INTERVAL", "30"))
+    SPILL_DIR = get_secret("SPILL_DIR")
+
+    # Standard questions answered in the background after ingestion (optional;
+    # costs one chat completion per question for every upload)
+    FAQ_ENABLED = get_secret("FAQ_ENABLED", "false").lower() == "true"
+    FAQ_QUESTIONS = [
+        question.strip() for question in get_secret(
+            "FAQ_QUESTIONS",
+            "Who is eligible to apply for this grant?|"
+            "What is the maximum funding amount?|"
+            "What are the application deadlines?|"
+            "What co-funding ratio is required from the applicant?|"
+            "What supporting documents must be submitted?"
+        ).split("|") if question.strip()
+    ]
+    FAQ_MATCH_THRESHOLD = float(get_secret("FAQ_MATCH_THRESHOLD", "0.97"))
+
+    # Library-wide search across shard worker processes (API server)
+    SHARDED_RETRIEVAL = get_secret("SHARDED_RETRIEVAL", "false").lower() == "true"
+    SHARD_COUNT = int(get_secret("SHARD_COUNT", "4"))
+    SHARD_TIMEOUT = float(get_secret("SHARD_TIMEOUT", "5.0"))
 
     # LLM Provider
     LLM_PROVIDER = get_secret("LLM_PROVIDER", "openai").lower()
@@ -46,11 +91,54 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY = get_secret("OPENAI_API_KEY")
     OPENAI_MODEL = get_secret("OPENAI_MODEL", "gpt-4o-mini")
+    OPENAI_BASE_URL = get_secret("OPENAI_BASE_URL", "https://api.openai.com/v1")
 
     # Google Gemini Configuration
     GOOGLE_API_KEY = get_secret("GOOGLE_API_KEY")
     GOOGLE_MODEL = get_secret("GOOGLE_MODEL", "gemini-1.5-flash")
 
+    # Shared HTTP connection pool for provider clients
+    HTTP_MAX_CONNECTIONS = int(get_secret("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE = int(get_secret("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(get_secret("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_TIMEOUT = float(get_secret("HTTP_TIMEOUT", "120"))
+
+    # Admission control: per provider/model budgets with fair per-session queuing
+    RATE_LIMIT_ENABLED = get_secret("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_RPM = float(get_secret("RATE_LIMIT_RPM", "500"))
+    RATE_LIMIT_TPM = float(get_secret("RATE_LIMIT_TPM", "200000"))
+    EMBEDDING_RATE_LIMIT_RPM = float(get_secret("EMBEDDING_RATE_LIMIT_RPM", "3000"))
+    EMBEDDING_RATE_LIMIT_TPM = float(get_secret("EMBEDDING_RATE_LIMIT_TPM", "1000000"))
+    RATE_LIMIT_MAX_WAIT = float(get_secret("RATE_LIMIT_MAX_WAIT", "30"))
+    RATE_LIMIT_COMPLETION_TOKENS = int(get_secret("RATE_LIMIT_COMPLETION_TOKENS", "1000"))
+
+    # Hedged requests / failover across OpenAI and Gemini
+    LLM_HEDGING_ENABLED = get_secret("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(get_secret("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_MIN_DELAY = float(get_secret("LLM_HEDGE_MIN_DELAY", "2.0"))
+    LLM_MAX_ERROR_RATE = float(get_secret("LLM_MAX_ERROR_RATE", "0.5"))
+    LLM_SLOW_FACTOR = float(get_secret("LLM_SLOW_FACTOR", "2.0"))
+    LLM_ROUTER_WINDOW = int(get_secret("LLM_ROUTER_WINDOW", "50"))
+    LLM_ROUTER_WORKERS = int(get_secret("LLM_ROUTER_WORKERS", "16"))
+
+    # Coalesce identical concurrent LLM/embedding requests into one API call
+    SINGLE_FLIGHT_ENABLED = get_secret("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+    # Proposal Generation ("single" completion or concurrent "sectioned")
+    PROPOSAL_MODE = get_secret("PROPOSAL_MODE", "single").lower()
+    PROPOSAL_SECTION_RETRIES = int(get_secret("PROPOSAL_SECTION_RETRIES", "2"))
+
+    # Batch Generation
+    BATCH_CONCURRENCY = int(get_secret("BATCH_CONCURRENCY", "4"))
+
+    # HTTP API Server
+    API_HOST = get_secret("API_HOST", "127.0.0.1")
+    API_PORT = int(get_secret("API_PORT", "8000"))
+    API_WORKERS = int(get_secret("API_WORKERS", "8"))
+    API_REQUEST_TIMEOUT = float(get_secret("API_REQUEST_TIMEOUT", "120"))
+    API_MAX_DOCUMENTS = int(get_secret("API_MAX_DOCUMENTS", "20"))
+    API_TOKEN = get_secret("API_TOKEN")
+
     # Validation
     @classmethod
     def validate(cls):
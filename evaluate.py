@@ -0,0 +1,428 @@
+"""
+Retrieval Evaluation Harness for GovGrant Assist
+Measures retrieval quality against latency and memory for index settings
+
+Usage:
+    python evaluate.py golden.jsonl
+    python evaluate.py golden.jsonl --sweep --json results.json
+    python evaluate.py golden.jsonl --chunk-size 800,1200 --top-k 3,5 --answers
+
+The golden set is JSON Lines, one question per line, with the pages of the
+guide that answer it (guide paths are relative to the golden file):
+
+    {"guide": "guides/smart_factory.pdf", "question": "What is the funding cap?", "pages": [4]}
+
+Every guide is ingested through RAGEngine once per chunking setting (chunk
+size, overlap) and searched with each index type and top-k, reporting
+recall@k and MRR over the expected pages, ingest time, index size, search
+latency and the size of the context sent to the LLM. Questions are embedded
+once up front: embedding latency is a network round trip that is the same
+for every configuration, so it is reported separately and search latency
+times only the index lookup. --answers also generates answers through
+LLMService and scores the pages they cite. With more than one configuration
+the table marks the Pareto frontier: settings no other setting beats on
+quality without being slower or sending more context.
+
+Index types: "flat" searches every chunk, "hierarchical" searches the best
+sections first (HIERARCHICAL_INDEX, on every guide regardless of
+HIERARCHY_MIN_CHUNKS).
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from clients import warm_up
+from config import Config
+from llm_service import LLMService
+from rag_engine import RAGEngine
+
+
+INDEX_TYPES = ("flat", "hierarchical")
+
+# Grid used by --sweep for any dimension not given explicitly
+SWEEP_GRID = {
+    "chunk_size": [500, 1000, 1500],
+    "chunk_overlap": [100, 200],
+    "index": list(INDEX_TYPES),
+    "top_k": [3, 5, 8],
+}
+
+_CITATION = re.compile(r"Page\s+(\d+)", re.IGNORECASE)
+
+
+def load_golden_set(path: str) -> Dict[str, List[Dict]]:
+    """
+    Read a golden set file
+
+    Args:
+        path: JSON Lines file of {"guide", "question", "pages"} records
+
+    Returns:
+        Questions grouped by guide path, in file order
+
+    Raises:
+        ValueError: If a line is malformed or a guide is missing
+    """
+    golden: Dict[str, List[Dict]] = OrderedDict()
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    with open(path) as golden_file:
+        for line_number, line in enumerate(golden_file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                guide = os.path.join(base_dir, record["guide"])
+                question = str(record["question"]).strip()
+                pages = {int(page) for page in record["pages"]}
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}:{line_number}: expected guide, question and pages ({e})")
+            if not question or not pages:
+                raise ValueError(f"{path}:{line_number}: question and pages must not be empty")
+            if not os.path.isfile(guide):
+                raise ValueError(f"{path}:{line_number}: guide not found: {guide}")
+            golden.setdefault(guide, []).append({"question": question, "pages": pages})
+
+    if not golden:
+        raise ValueError(f"{path}: no questions found")
+    return golden
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def score_retrieval(retrieved_pages: List[int], expected: set) -> Dict[str, float]:
+    """
+    Score one ranked result list
+
+    Args:
+        retrieved_pages: Page of each retrieved chunk, best first
+        expected: Pages that answer the question
+
+    Returns:
+        recall (share of expected pages retrieved) and reciprocal_rank
+        (1 / rank of the first chunk on an expected page, 0 if none)
+    """
+    recall = len(expected.intersection(retrieved_pages)) / len(expected)
+    reciprocal_rank = next(
+        (1.0 / rank for rank, page in enumerate(retrieved_pages, 1) if page in expected),
+        0.0
+    )
+    return {"recall": recall, "reciprocal_rank": reciprocal_rank}
+
+
+def score_citations(answer: str, expected: set) -> float:
+    """Share of the pages cited in an answer that are expected (0 if nothing is cited)"""
+    cited = {int(page) for page in _CITATION.findall(answer)}
+    if not cited:
+        return 0.0
+    return len(cited & expected) / len(cited)
+
+
+def config_variant(chunk_size: int, chunk_overlap: int, index: str, top_k: int):
+    """Config subclass with one configuration's settings"""
+    return type("EvaluationConfig", (Config,), {
+        "CHUNK_SIZE": chunk_size,
+        "CHUNK_OVERLAP": chunk_overlap,
+        "HIERARCHICAL_INDEX": index == "hierarchical",
+        # Score the hierarchical index on every guide, however short
+        "HIERARCHY_MIN_CHUNKS": 0,
+        "TOP_K_RESULTS": top_k,
+    })
+
+
+def embed_questions(golden: Dict[str, List[Dict]], embeddings) -> Tuple[Dict[str, List[float]], List[float]]:
+    """
+    Embed every golden question once; the vectors are reused by every configuration
+
+    Args:
+        golden: Golden set from load_golden_set
+        embeddings: Embeddings client
+
+    Returns:
+        Tuple of (vector per question, embedding latency per question in seconds)
+    """
+    vectors, latencies = {}, []
+    for questions in golden.values():
+        for item in questions:
+            if item["question"] not in vectors:
+                started = time.perf_counter()
+                vectors[item["question"]] = embeddings.embed_query(item["question"])
+                latencies.append(time.perf_counter() - started)
+    return vectors, latencies
+
+
+def _ingest(guide: str, config) -> RAGEngine:
+    rag_engine = RAGEngine(config)
+    with open(guide, "rb") as guide_file:
+        rag_engine.ingest_document(guide_file)
+    return rag_engine
+
+
+def _flat_copy(rag_engine: RAGEngine) -> RAGEngine:
+    """Copy of an engine without its section index, so every search is flat"""
+    flat = rag_engine.clone()
+    flat.sections = []
+    flat.section_index = None
+    return flat
+
+
+def evaluate_chunking(
+    golden: Dict[str, List[Dict]],
+    query_vectors: Dict[str, List[float]],
+    chunk_size: int,
+    chunk_overlap: int,
+    indexes: List[str],
+    top_ks: List[int],
+    answers: bool = False,
+    repeats: int = 5
+) -> List[Dict]:
+    """
+    Ingest every guide with one chunking configuration and score each index type and top-k
+
+    Chunks and vectors do not depend on the index type or top-k, so the
+    guides are embedded once: with sections when "hierarchical" is requested,
+    and the flat index is a copy with the section index dropped.
+
+    Args:
+        golden: Golden set from load_golden_set
+        query_vectors: Question embeddings from embed_questions
+        chunk_size: CHUNK_SIZE
+        chunk_overlap: CHUNK_OVERLAP
+        indexes: Index types to score ("flat", "hierarchical")
+        top_ks: TOP_K_RESULTS values to score
+        answers: Also generate answers and score their citations
+        repeats: Times each search is run; latency is taken over all runs
+
+    Returns:
+        One result dict per index type and top-k
+    """
+    ingest_index = "hierarchical" if "hierarchical" in indexes else "flat"
+    ingest_seconds = 0.0
+    ingested = {}
+    for guide in golden:
+        started = time.perf_counter()
+        ingested[guide] = _ingest(guide, config_variant(chunk_size, chunk_overlap, ingest_index, top_ks[0]))
+        ingest_seconds += time.perf_counter() - started
+
+    results = []
+    for index in indexes:
+        engines = {
+            guide: rag_engine if index == ingest_index else _flat_copy(rag_engine)
+            for guide, rag_engine in ingested.items()
+        }
+        index_bytes = sum(rag_engine.memory_usage()["total"] for rag_engine in engines.values())
+        chunks = sum(rag_engine.vector_store.index.ntotal for rag_engine in engines.values())
+
+        for top_k in top_ks:
+            recalls, reciprocal_ranks, citations, latencies, context_chars = [], [], [], [], []
+
+            for guide, questions in golden.items():
+                rag_engine = engines[guide]
+                rag_engine.config = config_variant(chunk_size, chunk_overlap, index, top_k)
+                llm_service = LLMService(rag_engine) if answers else None
+
+                for item in questions:
+                    vector = query_vectors[item["question"]]
+                    for _ in range(repeats):
+                        started = time.perf_counter()
+                        retrieved = rag_engine.similarity_search_by_vector(vector, top_k)
+                        latencies.append(time.perf_counter() - started)
+
+                    scores = score_retrieval([doc.metadata.get("page") for doc, _ in retrieved], item["pages"])
+                    recalls.append(scores["recall"])
+                    reciprocal_ranks.append(scores["reciprocal_rank"])
+                    context_chars.append(sum(len(doc.page_content) for doc, _ in retrieved))
+
+                    if llm_service is not None:
+                        citations.append(score_citations(llm_service.chat(item["question"]), item["pages"]))
+
+            results.append({
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "index": index,
+                "top_k": top_k,
+                "questions": len(recalls),
+                "recall": sum(recalls) / len(recalls),
+                "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+                "citation_accuracy": sum(citations) / len(citations) if citations else None,
+                "ingest_seconds": ingest_seconds,
+                "chunks": chunks,
+                "index_kb": index_bytes / 1024,
+                "search_p50_ms": 1000 * percentile(latencies, 0.50),
+                "search_p95_ms": 1000 * percentile(latencies, 0.95),
+                "context_chars": sum(context_chars) / len(context_chars),
+            })
+
+    return results
+
+
+def mark_pareto(results: List[Dict]):
+    """
+    Flag results on the quality/cost Pareto frontier (sets result["pareto"])
+
+    Quality is recall, MRR and citation accuracy (when measured); cost is
+    median search latency and context size. A result is on the frontier unless
+    another is at least as good on every axis and better on one.
+    """
+    def axes(result):
+        quality = [result["recall"], result["mrr"]]
+        if result["citation_accuracy"] is not None:
+            quality.append(result["citation_accuracy"])
+        # Negate costs so that larger is better on every axis
+        return quality + [-result["search_p50_ms"], -result["context_chars"]]
+
+    points = [axes(result) for result in results]
+    for result, point in zip(results, points):
+        result["pareto"] = not any(
+            all(o >= p for o, p in zip(other, point)) and any(o > p for o, p in zip(other, point))
+            for other in points if other is not point
+        )
+
+
+def print_report(results: List[Dict], embed_latencies: List[float]):
+    """Print query embedding latency, then one row per configuration, best recall first"""
+    show_pareto = len(results) > 1
+    print(
+        f"\nQuery embedding (all configurations): p50 {1000 * percentile(embed_latencies, 0.50):.1f} ms, "
+        f"p95 {1000 * percentile(embed_latencies, 0.95):.1f} ms"
+    )
+    print(
+        f"\n{'chunk':>6}{'overlap':>8}  {'index':<13}{'k':>3}{'recall@k':>10}{'MRR':>7}{'cite':>7}"
+        f"{'ingest s':>10}{'index KB':>10}{'search p50':>12}{'p95 ms':>9}{'context':>9}"
+        + ("  pareto" if show_pareto else "")
+    )
+    for result in sorted(results, key=lambda r: (-r["recall"], -r["mrr"], r["search_p50_ms"])):
+        citation = "-" if result["citation_accuracy"] is None else f"{result['citation_accuracy']:.2f}"
+        print(
+            f"{result['chunk_size']:>6}{result['chunk_overlap']:>8}  {result['index']:<13}{result['top_k']:>3}"
+            f"{result['recall']:>10.3f}{result['mrr']:>7.3f}{citation:>7}"
+            f"{result['ingest_seconds']:>10.1f}{result['index_kb']:>10.0f}"
+            f"{result['search_p50_ms']:>12.3f}{result['search_p95_ms']:>9.3f}{result['context_chars']:>9.0f}"
+            + (f"  {'*' if result['pareto'] else ''}" if show_pareto else "")
+        )
+
+
+def _parse_list(value: Optional[str], cast, name: str, default) -> list:
+    if value is None:
+        return default
+    try:
+        return [cast(item.strip()) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Measure retrieval quality against latency for chunking and index settings."
+    )
+    parser.add_argument("golden", help="Golden set (JSON Lines of guide, question, pages)")
+    parser.add_argument("--chunk-size", help=f"Comma-separated CHUNK_SIZE values (default: {Config.CHUNK_SIZE})")
+    parser.add_argument(
+        "--chunk-overlap",
+        help=f"Comma-separated CHUNK_OVERLAP values (default: {Config.CHUNK_OVERLAP})"
+    )
+    parser.add_argument("--top-k", help=f"Comma-separated TOP_K_RESULTS values (default: {Config.TOP_K_RESULTS})")
+    parser.add_argument("--index", help="Comma-separated index types: flat, hierarchical (default: from config)")
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Use the built-in grid for every setting not given explicitly"
+    )
+    parser.add_argument(
+        "--answers",
+        action="store_true",
+        help="Generate answers with the LLM and score their page citations (uses API credits)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Times each search is timed (default: 5)"
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    def default(name, current):
+        return SWEEP_GRID[name] if args.sweep else [current]
+
+    try:
+        chunk_sizes = _parse_list(args.chunk_size, int, "--chunk-size", default("chunk_size", Config.CHUNK_SIZE))
+        overlaps = _parse_list(
+            args.chunk_overlap, int, "--chunk-overlap", default("chunk_overlap", Config.CHUNK_OVERLAP)
+        )
+        top_ks = _parse_list(args.top_k, int, "--top-k", default("top_k", Config.TOP_K_RESULTS))
+        indexes = _parse_list(
+            args.index, str, "--index",
+            default("index", "hierarchical" if Config.HIERARCHICAL_INDEX else "flat")
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    unknown = set(indexes) - set(INDEX_TYPES)
+    if unknown:
+        parser.error(f"Unknown index type(s): {', '.join(sorted(unknown))}")
+    if not (chunk_sizes and overlaps and top_ks and indexes) or min(chunk_sizes + top_ks) < 1:
+        parser.error("Chunk sizes and top-k values must be positive")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    try:
+        Config.validate()
+        golden = load_golden_set(args.golden)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    combinations = [
+        (chunk_size, overlap)
+        for chunk_size, overlap in itertools.product(chunk_sizes, overlaps)
+        if overlap < chunk_size
+    ]
+    if not combinations:
+        parser.error("Every chunk overlap is at least as large as the chunk size")
+
+    warm_up()
+
+    query_vectors, embed_latencies = embed_questions(golden, RAGEngine().embeddings)
+
+    questions = sum(len(items) for items in golden.values())
+    results = []
+    for number, (chunk_size, overlap) in enumerate(combinations, 1):
+        print(
+            f"[{number}/{len(combinations)}] chunk_size={chunk_size} overlap={overlap}: "
+            f"{len(golden)} guides, {questions} questions",
+            file=sys.stderr
+        )
+        results.extend(evaluate_chunking(
+            golden, query_vectors, chunk_size, overlap, indexes, top_ks,
+            answers=args.answers, repeats=args.repeat
+        ))
+
+    for result in results:
+        result["embed_p50_ms"] = 1000 * percentile(embed_latencies, 0.50)
+        result["embed_p95_ms"] = 1000 * percentile(embed_latencies, 0.95)
+
+    mark_pareto(results)
+    print_report(results, embed_latencies)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
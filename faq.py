@@ -0,0 +1,143 @@
+"""
+Precomputed FAQ Answers for GovGrant Assist
+Answers a standard set of questions once per ingested document, in the
+background, so the most common first questions are served instantly
+
+Answers are generated through LLMService.chat (so they carry the usual page
+citations) and stored on the document's RAGEngine, which every session
+sharing that document sees. A user's question is served from the FAQ when
+it matches a standard question exactly or, on the first turn of a
+conversation, by embedding similarity.
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from llm_service import LLMService
+from rag_engine import RAGEngine
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(question: str) -> str:
+    return _WHITESPACE.sub(" ", question.strip().lower()).rstrip("?").strip()
+
+
+class PrecomputedFAQ:
+    """Standard questions and their cited answers for one document"""
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, questions: List[str], threshold: float = None):
+        """
+        Initialize FAQ
+
+        Args:
+            questions: Standard questions to answer
+            threshold: Cosine similarity at or above which a user question matches
+        """
+        self.questions = questions
+        self.threshold = threshold if threshold is not None else Config.FAQ_MATCH_THRESHOLD
+        self.status = self.PENDING
+        self.entries: List[Dict] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._exact: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        """True once answers are available"""
+        return self.status == self.READY
+
+    def build(self, llm_service: LLMService):
+        """
+        Answer every question and index the questions for matching
+
+        Questions whose answer failed are left out. Marks the FAQ ready (or
+        failed if nothing could be answered).
+
+        Args:
+            llm_service: Service bound to the document's RAGEngine
+        """
+        entries = []
+        for question in self.questions:
+            answer = llm_service.chat(question)
+            if not answer.startswith("❌"):
+                entries.append({"question": question, "answer": answer})
+
+        if not entries:
+            self.status = self.FAILED
+            return
+
+        vectors = np.array(
+            llm_service.rag_engine.embeddings.embed_documents([entry["question"] for entry in entries]),
+            dtype=np.float32
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        with self._lock:
+            self.entries = entries
+            self._vectors = vectors
+            self._exact = {_normalize(entry["question"]): entry for entry in entries}
+            self.status = self.READY
+
+    def match(self, question: str, query_vector: Optional[List[float]] = None) -> Optional[Dict]:
+        """
+        Find the precomputed entry answering a user question
+
+        Without a query vector only exact (normalized) matches are found, so
+        callers can skip embedding the question when it is a standard one.
+
+        Args:
+            question: User's question
+            query_vector: The question's embedding, shared with retrieval
+
+        Returns:
+            {"question", "answer"} entry, or None if nothing matches closely enough
+        """
+        if not self.is_ready:
+            return None
+
+        entry = self._exact.get(_normalize(question))
+        if entry is not None or query_vector is None:
+            return entry
+
+        query = np.array(query_vector, dtype=np.float32)
+        similarities = self._vectors @ (query / np.linalg.norm(query))
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return self.entries[best]
+        return None
+
+    def suggestions(self) -> List[str]:
+        """Questions with ready answers, for suggested-question buttons"""
+        return [entry["question"] for entry in self.entries] if self.is_ready else []
+
+
+def precompute_faq(rag_engine: RAGEngine, session_id: Optional[str] = None) -> PrecomputedFAQ:
+    """
+    Attach a PrecomputedFAQ to an engine and answer its questions
+
+    Blocks while answering; run it on a background worker. The FAQ is
+    attached before answering starts, so the UI can tell it is pending.
+
+    Args:
+        rag_engine: Engine with an ingested document
+        session_id: Session the LLM calls are attributed to for admission control
+
+    Returns:
+        The FAQ (ready, or failed if no question could be answered)
+    """
+    faq = PrecomputedFAQ(Config.FAQ_QUESTIONS)
+    rag_engine.faq = faq
+    try:
+        faq.build(LLMService(rag_engine, session_id=session_id))
+    except Exception:
+        faq.status = PrecomputedFAQ.FAILED
+    return faq
@@ -0,0 +1,173 @@
+"""
+Background Ingestion Jobs for GovGrant Assist
+Runs RAGEngine.ingest_document off the Streamlit script thread
+
+Jobs are keyed by the document's content digest, so identical uploads (from
+one session after a refresh, or from several sessions at once) share a single
+job and its resulting RAGEngine. The manager is process-wide: Streamlit
+imports this module once per server process.
+
+When Config.FAQ_ENABLED, each finished document then has its standard
+questions answered on a separate pool (see faq.py), so the FAQ stage never
+holds up the next ingestion.
+
+A job may name a finished base job: the new document is then treated as a
+revision of it, and only the chunks that changed are embedded (on a copy of
+the base engine, so sessions using the original are unaffected).
+"""
+import io
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from config import Config
+from faq import precompute_faq
+from memory_manager import track
+from rag_engine import RAGEngine
+from utils.digest import file_digest
+from utils.rate_limiter import session_scope
+
+
+class IngestJob:
+    """Status and result of one document ingestion"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, document_id: str, filename: str):
+        self.document_id = document_id
+        self.filename = filename
+        self.status = self.QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.rag_engine: Optional[RAGEngine] = None
+        self.stats: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def is_active(self) -> bool:
+        """True while the job is queued or running"""
+        return self.status in (self.QUEUED, self.RUNNING)
+
+    def _update_progress(self, fraction: float, message: str):
+        self.progress = max(0.0, min(1.0, fraction))
+        self.message = message
+
+
+class IngestJobManager:
+    """
+    Executes ingestion jobs on a small worker pool
+    Finished jobs are retained (most recent `retention` of them) so later
+    uploads of the same document attach to the existing result instantly
+    """
+
+    def __init__(self, max_workers: int = None, retention: int = None):
+        self.retention = retention or Config.INGEST_JOB_RETENTION
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.INGEST_WORKERS,
+            thread_name_prefix="ingest"
+        )
+        self._faq_executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.INGEST_WORKERS,
+            thread_name_prefix="faq"
+        )
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        file_buffer,
+        document_id: Optional[str] = None,
+        base_document_id: Optional[str] = None
+    ) -> IngestJob:
+        """
+        Start ingesting a document, or return the job already handling it
+
+        Args:
+            file_buffer: Uploaded PDF buffer (copied, so the caller may discard it)
+            document_id: Content digest if already computed
+            base_document_id: Digest of a previously ingested version to
+                update incrementally (ignored unless that job is done)
+
+        Returns:
+            The job for this document
+        """
+        document_id = document_id or file_digest(file_buffer)
+
+        with self._lock:
+            job = self._jobs.get(document_id)
+            if job is not None and job.status != IngestJob.FAILED:
+                self._jobs.move_to_end(document_id)
+                return job
+
+            # Copy the bytes: Streamlit upload buffers belong to the session
+            file_buffer.seek(0)
+            data = file_buffer.read()
+            file_buffer.seek(0)
+
+            base = self._jobs.get(base_document_id) if base_document_id else None
+            base_engine = base.rag_engine if base is not None and base.status == IngestJob.DONE else None
+
+            job = IngestJob(document_id, file_buffer.name)
+            self._jobs[document_id] = job
+            self._evict_finished()
+
+        self._executor.submit(self._run, job, data, base_engine)
+        return job
+
+    def get(self, document_id: str) -> Optional[IngestJob]:
+        """Look up a job by document digest"""
+        with self._lock:
+            return self._jobs.get(document_id)
+
+    def _run(self, job: IngestJob, data: bytes, base_engine: Optional[RAGEngine] = None):
+        job.status = IngestJob.RUNNING
+        job.message = "Starting"
+
+        buffer = io.BytesIO(data)
+        buffer.name = job.filename
+
+        try:
+            # Ingestion queues for embedding budget as its own "session"
+            with session_scope(f"ingest:{job.document_id[:12]}"):
+                if base_engine is not None:
+                    rag_engine = base_engine.clone()
+                    job.stats = rag_engine.reingest_document(buffer, progress_callback=job._update_progress)
+                else:
+                    rag_engine = RAGEngine()
+                    job.stats = rag_engine.ingest_document(buffer, progress_callback=job._update_progress)
+            job.rag_engine = rag_engine
+            track(rag_engine)
+            job.status = IngestJob.DONE
+            if Config.FAQ_ENABLED:
+                self._faq_executor.submit(precompute_faq, rag_engine, f"faq:{job.document_id[:12]}")
+        except Exception as e:
+            job.error = str(e)
+            job.status = IngestJob.FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond the retention limit (lock held)"""
+        finished = [doc_id for doc_id, job in self._jobs.items() if not job.is_active]
+        for doc_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[doc_id]
+
+
+_manager: Optional[IngestJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> IngestJobManager:
+    """Return the process-wide job manager, creating it on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = IngestJobManager()
+        return _manager
@@ -0,0 +1,302 @@
+"""
+LLM Router for GovGrant Assist
+Hedged requests and failover across several chat providers
+
+The router holds one chat model per provider and tracks each provider's
+rolling latency and error rate. A request goes to the healthiest provider
+first (providers that are failing, or much slower than the fastest one,
+move to the back); if it has not answered by the hedge deadline the same
+request is also sent to the next provider and the first successful answer
+wins. Errors fail over to the next provider.
+
+The hedge deadline is the fastest provider's latency percentile (p95 by
+default), not the current provider's own, so a provider that slows down
+cannot push its own deadline out of reach. Attempts that lose a race are
+not recorded as completed calls; how long they had been running when
+abandoned is kept for ranking only.
+
+Providers are any objects with LangChain-style invoke(messages) and
+stream(messages) methods, so local stubs can stand in for real APIs.
+"""
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from clients import get_chat_model
+from config import Config
+
+
+class ProviderStats:
+    """Rolling latency and error-rate window for one provider"""
+
+    def __init__(self, name: str, model: Any, window: int):
+        self.name = name
+        self.model = model
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        # Completed latencies plus the elapsed time of abandoned attempts
+        # (a lower bound on how slow they were), for ranking
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok and latency is not None:
+                self._latencies.append(latency)
+                self._recent.append(latency)
+
+    def record_abandoned(self, elapsed: float):
+        """Note an attempt that lost a hedge race after running `elapsed` seconds"""
+        with self._lock:
+            self._recent.append(elapsed)
+
+    def recent_latency(self, min_samples: int = 5) -> Optional[float]:
+        """Median of recent (completed or abandoned) latencies, or None until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._recent)
+        if len(samples) < min_samples:
+            return None
+        return samples[len(samples) // 2]
+
+    def latency_percentile(self, percentile: float, min_samples: int = 5) -> Optional[float]:
+        """Latency at the given percentile, or None until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < min_samples:
+            return None
+        index = max(0, math.ceil(percentile * len(samples)) - 1)
+        return samples[index]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def snapshot(self, percentile: float) -> Dict:
+        return {
+            "latency_p": self.latency_percentile(percentile),
+            "recent_latency": self.recent_latency(),
+            "error_rate": self.error_rate(),
+            "samples": len(self._outcomes),
+        }
+
+
+class LLMRouter:
+    """
+    Routes chat requests across providers with hedging and failover
+    Exposes invoke() and stream() so it can stand in for a single chat model
+    """
+
+    def __init__(
+        self,
+        providers: List[Tuple[str, Any]],
+        hedge_percentile: float = None,
+        hedge_min_delay: float = None,
+        max_error_rate: float = None,
+        slow_factor: float = None,
+        window: int = None,
+        max_workers: int = None
+    ):
+        """
+        Initialize router
+
+        Args:
+            providers: (name, chat_model) pairs in order of preference
+            hedge_percentile: Latency percentile after which a hedge is sent
+            hedge_min_delay: Lower bound (seconds) on the hedge deadline, also
+                used until a provider has enough latency samples
+            max_error_rate: Providers above this rolling error rate are tried last
+            slow_factor: Providers whose recent median latency exceeds this
+                multiple of the fastest provider's are tried after the others
+            window: Number of recent calls tracked per provider
+            max_workers: Threads available for concurrent provider calls
+        """
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+
+        window = window or Config.LLM_ROUTER_WINDOW
+        self.providers = [ProviderStats(name, model, window) for name, model in providers]
+        self.hedge_percentile = hedge_percentile or Config.LLM_HEDGE_PERCENTILE
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else Config.LLM_HEDGE_MIN_DELAY
+        self.max_error_rate = max_error_rate if max_error_rate is not None else Config.LLM_MAX_ERROR_RATE
+        self.slow_factor = slow_factor or Config.LLM_SLOW_FACTOR
+        self.model_name = "router:" + ",".join(name for name, _ in providers)
+        self.hedges = 0
+        self.failovers = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.LLM_ROUTER_WORKERS,
+            thread_name_prefix="llm-router"
+        )
+
+    def _ranked(self) -> List[ProviderStats]:
+        """
+        Providers in preference order: failing ones last, then ones much
+        slower than the fastest; otherwise the configured order is kept
+        """
+        latencies = {p.name: p.recent_latency() for p in self.providers}
+        known = [latency for latency in latencies.values() if latency is not None]
+        fastest = min(known) if known else None
+
+        def key(p: ProviderStats):
+            latency = latencies[p.name]
+            slow = fastest is not None and latency is not None and latency > self.slow_factor * fastest
+            return (p.error_rate() > self.max_error_rate, slow)
+
+        return sorted(self.providers, key=key)
+
+    def _hedge_delay(self) -> float:
+        """Deadline for hedging: the fastest provider's latency percentile"""
+        baselines = [
+            latency for latency in (p.latency_percentile(self.hedge_percentile) for p in self.providers)
+            if latency is not None
+        ]
+        if not baselines:
+            return self.hedge_min_delay
+        return max(self.hedge_min_delay, min(baselines))
+
+    def _submit(self, provider: ProviderStats, messages: list, settled: threading.Event):
+        # Run in a copy of the caller's context so session attribution follows
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._call, provider, messages, settled)
+
+    def _call(self, provider: ProviderStats, messages: list, settled: threading.Event):
+        start = time.monotonic()
+        try:
+            result = provider.model.invoke(messages)
+        except Exception:
+            if not settled.is_set():
+                provider.record(None, ok=False)
+            raise
+        # Attempts that finish after another won were already noted as abandoned
+        if not settled.is_set():
+            provider.record(time.monotonic() - start, ok=True)
+        return result
+
+    def invoke(self, messages: list):
+        """
+        Send messages to the best provider, hedging and failing over as needed
+
+        Args:
+            messages: LangChain messages
+
+        Returns:
+            The first successful provider response
+
+        Raises:
+            RuntimeError: If every provider failed
+        """
+        remaining = self._ranked()
+        errors = []
+        pending = {}
+        started = {}
+        settled = threading.Event()
+        deadline = self._hedge_delay()
+
+        def launch():
+            provider = remaining.pop(0)
+            future = self._submit(provider, messages, settled)
+            pending[future] = provider
+            started[future] = time.monotonic()
+
+        launch()
+
+        while pending:
+            done, _ = wait(
+                pending,
+                timeout=deadline if remaining else None,
+                return_when=FIRST_COMPLETED
+            )
+
+            if not done:
+                # Current attempt passed the hedge deadline: hedge
+                launch()
+                self.hedges += 1
+                continue
+
+            for future in done:
+                failed = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{failed.name}: {e}")
+                    continue
+
+                settled.set()
+                now = time.monotonic()
+                for loser, provider in pending.items():
+                    provider.record_abandoned(now - started[loser])
+                    loser.cancel()
+                return result
+
+            if not pending and remaining:
+                # Every in-flight attempt failed: fail over
+                launch()
+                self.failovers += 1
+
+        raise RuntimeError("All LLM providers failed: " + "; ".join(errors))
+
+    def stream(self, messages: list) -> Iterator:
+        """
+        Stream from the best provider, failing over if it errors before the
+        first chunk (streams are not hedged)
+
+        Args:
+            messages: LangChain messages
+
+        Yields:
+            Message chunks from whichever provider answers
+        """
+        errors = []
+        for provider in self._ranked():
+            start = time.monotonic()
+            started = False
+            try:
+                for chunk in provider.model.stream(messages):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                provider.record(None, ok=False)
+                if started:
+                    raise
+                errors.append(f"{provider.name}: {e}")
+                self.failovers += 1
+                continue
+            provider.record(time.monotonic() - start, ok=True)
+            return
+
+        raise RuntimeError("All LLM providers failed: " + "; ".join(errors))
+
+    def snapshot(self) -> Dict:
+        """Per-provider latency/error metrics plus hedge and failover counts"""
+        return {
+            "providers": {p.name: p.snapshot(self.hedge_percentile) for p in self.providers},
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+        }
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """
+    Return the process-wide router over every configured provider
+    Config.LLM_PROVIDER is preferred; the other provider is added when its
+    API key is set
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            names = [Config.LLM_PROVIDER] + [
+                name for name, key in (("openai", Config.OPENAI_API_KEY), ("google", Config.GOOGLE_API_KEY))
+                if key and name != Config.LLM_PROVIDER
+            ]
+            _router = LLMRouter([(name, get_chat_model(name)) for name in names])
+        return _router
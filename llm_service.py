@@ -3,12 +3,71 @@ LLM Service for GovGrant Assist
 Handles chat and proposal generation
 Implements prompt specifications from PRD Section 9
 """
-from typing import List, Dict, Optional
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from config import Config
+from clients import get_chat_model
+from llm_router import get_router
 from rag_engine import RAGEngine
+from utils.rate_limiter import session_scope
+from utils.single_flight import fingerprint, shared_flight
+
+
+# Sections generated independently in sectioned proposal mode, in output order.
+# Each section retrieves its own context so the prompt only carries what that
+# section needs.
+PROPOSAL_SECTIONS = [
+    {
+        "title": "Executive Summary",
+        "queries": [
+            "What are the key objectives of this grant?",
+            "What is the required proposal format or structure?"
+        ],
+        "instructions": "Summarise the project, the applicant and the expected impact in 2-3 paragraphs.",
+        "requires_budget": False
+    },
+    {
+        "title": "Alignment with Grant Objectives",
+        "queries": [
+            "What are the key objectives of this grant?",
+            "What are the evaluation criteria?"
+        ],
+        "instructions": "Map the project explicitly to each grant objective and evaluation criterion.",
+        "requires_budget": False
+    },
+    {
+        "title": "Proposed Solution",
+        "queries": [
+            "What types of projects or activities are supported?",
+            "What is the required proposal format or structure?"
+        ],
+        "instructions": "Describe the solution, its implementation approach and timeline.",
+        "requires_budget": False
+    },
+    {
+        "title": "Budget Justification",
+        "queries": [
+            "What are the budget requirements and limits?",
+            "What costs are eligible or qualifying for funding?"
+        ],
+        "instructions": (
+            "Justify the requested budget against eligible costs. If it exceeds "
+            "the limit mentioned in the Context, add a ⚠️ WARNING note."
+        ),
+        "requires_budget": True
+    },
+    {
+        "title": "Expected Outcomes",
+        "queries": [
+            "What outcomes or deliverables are expected?",
+            "What are the evaluation criteria?"
+        ],
+        "instructions": "State measurable outcomes and how they will be tracked.",
+        "requires_budget": False
+    },
+]
 
 
 class LLMService:
@@ -17,53 +76,114 @@ class LLMService:
     Supports both OpenAI and Google Gemini
     """
 
-    def __init__(self, rag_engine: RAGEngine):
+    def __init__(self, rag_engine: RAGEngine, session_id: Optional[str] = None, raise_errors: bool = False):
         """
         Initialize LLM service
 
         Args:
             rag_engine: Initialized RAG engine for retrieval
+            session_id: Identifies the user session for fair provider queuing
+            raise_errors: Let chat errors propagate instead of returning
+                "❌" messages (for callers that map errors themselves, e.g. the API)
         """
         self.rag_engine = rag_engine
+        self.session_id = session_id
+        self.raise_errors = raise_errors
         self.config = Config
 
-        # Initialize LLM based on provider
-        if self.config.LLM_PROVIDER == "openai":
-            self.llm = ChatOpenAI(
-                model=self.config.OPENAI_MODEL,
-                openai_api_key=self.config.OPENAI_API_KEY,
-                temperature=0.3  # Lower temperature for factual compliance
-            )
-        elif self.config.LLM_PROVIDER == "google":
-            self.llm = ChatGoogleGenerativeAI(
-                model=self.config.GOOGLE_MODEL,
-                google_api_key=self.config.GOOGLE_API_KEY,
-                temperature=0.3
-            )
+        # Initialize LLM: a hedging router over all configured providers,
+        # or the single configured provider (both shared process-wide)
+        if self.config.LLM_HEDGING_ENABLED:
+            self.llm = get_router()
         else:
-            raise ValueError(f"Unsupported LLM provider: {self.config.LLM_PROVIDER}")
+            self.llm = get_chat_model(self.config.LLM_PROVIDER)
 
-    def chat(self, user_query: str, chat_history: List[Dict] = None) -> str:
+    def _invoke(self, messages: list):
         """
-        Chat with RAG-powered assistant
-        Per PRD Section 3.1: Strict grounding with citations
+        Call the LLM, coalescing identical concurrent requests
+        Requests are identical when model, parameters and messages all match
+
+        Args:
+            messages: LangChain messages
+
+        Returns:
+            The LLM response message (shared between coalesced callers)
+        """
+        with session_scope(self.session_id):
+            if not self.config.SINGLE_FLIGHT_ENABLED:
+                return self.llm.invoke(messages)
+
+            key = fingerprint(
+                "chat",
+                type(self.llm).__name__,
+                getattr(self.llm, "model_name", None) or getattr(self.llm, "model", None),
+                getattr(self.llm, "temperature", None),
+                [(message.type, message.content) for message in messages]
+            )
+            return shared_flight.do(key, lambda: self.llm.invoke(messages))
+
+    def _get_context(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> str:
+        """Retrieve context, attributing the query embedding to this session"""
+        with session_scope(self.session_id):
+            return self.rag_engine.get_relevant_context(query, k, query_vector)
+
+    def _prepare_turn(
+        self,
+        user_query: str,
+        chat_history: List[Dict] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up a precomputed answer, else retrieve context for a chat turn
+        The query is embedded at most once; the FAQ match and retrieval share it.
+        Mid-conversation only a verbatim standard question is served from the
+        FAQ, since a similar-looking follow-up may depend on earlier turns.
 
         Args:
             user_query: User's question
             chat_history: Previous conversation (list of {role, content} dicts)
 
         Returns:
-            AI response with citations
+            Tuple of (precomputed answer, None) or (None, context)
         """
-        if not self.rag_engine.is_ready():
-            return "❌ Please upload a Grant Guide in the sidebar first."
+        faq = self.rag_engine.faq
+        if faq is None or not faq.is_ready:
+            return None, self._get_context(user_query)
+
+        # Standard questions asked verbatim need no embedding at all
+        entry = faq.match(user_query)
+        if entry is not None:
+            return entry["answer"], None
+        if chat_history:
+            return None, self._get_context(user_query)
 
-        # Retrieve relevant context
+        with session_scope(self.session_id):
+            query_vector = self.rag_engine.embed_query(user_query)
         try:
-            context = self.rag_engine.get_relevant_context(user_query)
-        except Exception as e:
-            return f"❌ Error retrieving information: {str(e)}"
+            entry = faq.match(user_query, query_vector)
+        except Exception:
+            entry = None  # Fall back to answering it normally
+        if entry is not None:
+            return entry["answer"], None
 
+        return None, self._get_context(user_query, query_vector=query_vector)
+
+    def _build_chat_messages(self, user_query: str, context: str, chat_history: List[Dict] = None) -> list:
+        """
+        Build the grounded message list for a chat turn
+
+        Args:
+            user_query: User's question
+            context: Retrieved context with page citations
+            chat_history: Previous conversation (list of {role, content} dicts)
+
+        Returns:
+            List of LangChain messages
+        """
         # Build system prompt
         system_prompt = """You are an expert Government Grant Compliance Assistant.
 
@@ -98,19 +218,89 @@ Remember: Your role is to help users understand grant requirements accurately. H
         # Add current query
         messages.append(HumanMessage(content=user_query))
 
+        return messages
+
+    def chat(self, user_query: str, chat_history: List[Dict] = None) -> str:
+        """
+        Chat with RAG-powered assistant
+        Per PRD Section 3.1: Strict grounding with citations
+
+        Args:
+            user_query: User's question
+            chat_history: Previous conversation (list of {role, content} dicts)
+
+        Returns:
+            AI response with citations
+        """
+        if not self.rag_engine.is_ready():
+            return "❌ Please upload a Grant Guide in the sidebar first."
+
+        # Retrieve relevant context (standard questions were answered at ingest time)
+        try:
+            faq_answer, context = self._prepare_turn(user_query, chat_history)
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            return f"❌ Error retrieving information: {str(e)}"
+        if faq_answer is not None:
+            return faq_answer
+
+        messages = self._build_chat_messages(user_query, context, chat_history)
+
         # Get response
         try:
-            response = self.llm.invoke(messages)
+            response = self._invoke(messages)
             return response.content
         except Exception as e:
+            if self.raise_errors:
+                raise
             return f"❌ Error generating response: {str(e)}"
 
+    def stream_chat(self, user_query: str, chat_history: List[Dict] = None) -> Iterator[str]:
+        """
+        Streaming variant of chat()
+
+        Args:
+            user_query: User's question
+            chat_history: Previous conversation (list of {role, content} dicts)
+
+        Yields:
+            Response text fragments as the LLM produces them
+        """
+        if not self.rag_engine.is_ready():
+            yield "❌ Please upload a Grant Guide in the sidebar first."
+            return
+
+        try:
+            faq_answer, context = self._prepare_turn(user_query, chat_history)
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            yield f"❌ Error retrieving information: {str(e)}"
+            return
+        if faq_answer is not None:
+            yield faq_answer
+            return
+
+        messages = self._build_chat_messages(user_query, context, chat_history)
+
+        try:
+            with session_scope(self.session_id):
+                for chunk in self.llm.stream(messages):
+                    if chunk.content:
+                        yield chunk.content
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            yield f"❌ Error generating response: {str(e)}"
+
     def generate_proposal(
         self,
         company_name: str,
         project_title: str,
         core_solution: str,
-        requested_budget: Optional[float] = None
+        requested_budget: Optional[float] = None,
+        sectioned: Optional[bool] = None
     ) -> str:
         """
         Generate grant proposal using Writer Agent
@@ -121,6 +311,8 @@ Remember: Your role is to help users understand grant requirements accurately. H
             project_title: Project title
             core_solution: Project description
             requested_budget: Budget amount (optional)
+            sectioned: Generate each section concurrently instead of in one
+                completion (defaults to Config.PROPOSAL_MODE == "sectioned")
 
         Returns:
             Formatted markdown proposal
@@ -128,6 +320,14 @@ Remember: Your role is to help users understand grant requirements accurately. H
         if not self.rag_engine.is_ready():
             return "❌ Please upload a Grant Guide in the sidebar first."
 
+        if sectioned is None:
+            sectioned = self.config.PROPOSAL_MODE == "sectioned"
+
+        if sectioned:
+            return self._generate_proposal_sectioned(
+                company_name, project_title, core_solution, requested_budget
+            )
+
         # Retrieve relevant context for proposal structure
         queries = [
             "What are the evaluation criteria?",
@@ -139,7 +339,7 @@ Remember: Your role is to help users understand grant requirements accurately. H
         context_parts = []
         for query in queries:
             try:
-                context = self.rag_engine.get_relevant_context(query, k=2)
+                context = self._get_context(query, k=2)
                 context_parts.append(context)
             except:
                 pass
@@ -178,13 +378,13 @@ Make it professional, compelling, and compliant."""
         formatted_system = system_prompt.format(context=full_context)
 
         # User message with project details
-        budget_text = f"\n- **Requested Budget:** ${requested_budget:,.2f}" if requested_budget else ""
+        project_details = self._format_project_details(
+            company_name, project_title, core_solution, requested_budget
+        )
 
         user_message = f"""Please generate a grant proposal based on the following project information:
 
-- **Company Name:** {company_name}
-- **Project Title:** {project_title}
-- **Core Solution:** {core_solution}{budget_text}
+{project_details}
 
 Ensure the proposal follows the grant guidelines from the uploaded document."""
 
@@ -195,11 +395,126 @@ Ensure the proposal follows the grant guidelines from the uploaded document."""
 
         # Generate proposal
         try:
-            response = self.llm.invoke(messages)
+            response = self._invoke(messages)
             proposal = response.content
 
             # Add header
-            header = f"""# Grant Proposal: {project_title}
+            return self._proposal_header(company_name, project_title) + proposal
+
+        except Exception as e:
+            return f"❌ Error generating proposal: {str(e)}"
+
+    def _generate_proposal_sectioned(
+        self,
+        company_name: str,
+        project_title: str,
+        core_solution: str,
+        requested_budget: Optional[float] = None
+    ) -> str:
+        """
+        Generate every proposal section concurrently and assemble them in order
+        Wall-clock time is roughly that of the slowest section
+
+        Returns:
+            Formatted markdown proposal
+        """
+        sections = [
+            section for section in PROPOSAL_SECTIONS
+            if requested_budget or not section["requires_budget"]
+        ]
+        project_details = self._format_project_details(
+            company_name, project_title, core_solution, requested_budget
+        )
+
+        with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+            futures = [
+                executor.submit(self._generate_section, section, project_details)
+                for section in sections
+            ]
+
+            parts = []
+            for section, future in zip(sections, futures):
+                try:
+                    parts.append(future.result())
+                except Exception as e:
+                    return f"❌ Error generating proposal section '{section['title']}': {str(e)}"
+
+        return self._proposal_header(company_name, project_title) + "\n\n".join(parts)
+
+    def _generate_section(self, section: dict, project_details: str) -> str:
+        """
+        Generate a single proposal section, retrying it independently on failure
+
+        Args:
+            section: Entry from PROPOSAL_SECTIONS
+            project_details: Formatted project information
+
+        Returns:
+            Markdown for the section, starting with its heading
+        """
+        context_parts = []
+        for query in section["queries"]:
+            try:
+                context_parts.append(self._get_context(query, k=2))
+            except Exception:
+                pass
+
+        system_prompt = """You are an expert Government Grant Consultant writing ONE section of a formal grant proposal.
+
+You MUST follow the guidelines found in the provided CONTEXT (The Grant Guide).
+
+RULES:
+1. Write ONLY the "{title}" section. Start with the heading "## {title}" and do not write any other section.
+2. {instructions}
+3. Use professional, objective, formal language appropriate for government submissions.
+4. CITE the page number from the Context for every compliance claim using format: (Per Grant Guide, Page X)
+5. DO NOT fabricate requirements or guidelines not in the CONTEXT.
+
+CONTEXT FROM GRANT GUIDE:
+{context}"""
+
+        messages = [
+            SystemMessage(content=system_prompt.format(
+                title=section["title"],
+                instructions=section["instructions"],
+                context="\n\n".join(context_parts)
+            )),
+            HumanMessage(content=f"""Write the "{section['title']}" section for this project:
+
+{project_details}""")
+        ]
+
+        retries = self.config.PROPOSAL_SECTION_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                content = self._invoke(messages).content.strip()
+                break
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(2 ** attempt)  # Back off before retrying this section
+
+        if not content.startswith("#"):
+            content = f"## {section['title']}\n\n{content}"
+        return content
+
+    def _format_project_details(
+        self,
+        company_name: str,
+        project_title: str,
+        core_solution: str,
+        requested_budget: Optional[float] = None
+    ) -> str:
+        """Format the user's project inputs as a Markdown list"""
+        budget_text = f"\n- **Requested Budget:** ${requested_budget:,.2f}" if requested_budget else ""
+
+        return f"""- **Company Name:** {company_name}
+- **Project Title:** {project_title}
+- **Core Solution:** {core_solution}{budget_text}"""
+
+    def _proposal_header(self, company_name: str, project_title: str) -> str:
+        """Markdown header prepended to every generated proposal"""
+        return f"""# Grant Proposal: {project_title}
 
 **Applicant:** {company_name}
 **Generated:** {self._get_current_date()}
@@ -207,10 +522,6 @@ Ensure the proposal follows the grant guidelines from the uploaded document."""
 ---
 
 """
-            return header + proposal
-
-        except Exception as e:
-            return f"❌ Error generating proposal: {str(e)}"
 
     def _get_current_date(self) -> str:
         """Get current date for proposal"""
@@ -0,0 +1,593 @@
+"""
+Load Test Harness for GovGrant Assist
+Drives many simulated sessions through upload, chat turns and proposal
+generation against RAGEngine and LLMService, at rising concurrency, with
+local stand-ins for the provider APIs
+
+Usage:
+    python loadtest.py GUIDE.pdf --concurrency 1,5,10,25
+    python loadtest.py GUIDE.pdf --chat-latency lognormal:1.5,0.5 --json results.json
+
+The stub server speaks the OpenAI embeddings and chat completions APIs
+(including streaming) and Config.OPENAI_BASE_URL is pointed at it, so the
+production client stack (connection pool, admission control, single-flight)
+is exercised unchanged and no real provider is called.
+
+Latency specs: fixed:SECONDS, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA,
+exp:MEAN. For each concurrency level the report gives throughput, p50/p95/p99
+latency per operation and memory per session.
+"""
+import argparse
+import asyncio
+import base64
+import gc
+import io
+import json
+import math
+import os
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from aiohttp import web
+
+from clients import warm_up
+from config import Config
+from ingest_jobs import IngestJob, get_job_manager
+from llm_service import LLMService
+from rag_engine import RAGEngine
+from utils.digest import compute_digest
+
+
+CHAT_QUESTIONS = [
+    "Who is eligible to apply for this grant?",
+    "What is the maximum funding amount?",
+    "When is the application deadline?",
+    "What co-funding ratio is required?",
+    "Which supporting documents must be submitted?",
+    "Are overseas subsidiaries eligible?",
+    "What costs are not supported?",
+    "How are applications evaluated?",
+]
+
+PROPOSAL_INPUT = {
+    "company_name": "Load Test Pte Ltd",
+    "project_title": "Automated Inspection Platform",
+    "core_solution": (
+        "A computer-vision platform that inspects manufactured parts on the line, "
+        "flags defects in real time and feeds results into the quality system."
+    ),
+    "requested_budget": 150000.0,
+}
+
+_WORDS = (
+    "applicants eligible funding project costs supported grant scheme must "
+    "provide evidence company local registered qualifying expenses period"
+).split()
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution spec
+
+    Args:
+        spec: fixed:S, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA or exp:MEAN (seconds)
+
+    Returns:
+        Callable drawing one latency (seconds) from a random.Random
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec}")
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp" and len(values) == 1 and values[0] > 0:
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+class StubProviderServer:
+    """
+    Local OpenAI-compatible embeddings and chat server with synthetic latency
+    Runs an aiohttp app on its own event loop thread
+    """
+
+    def __init__(
+        self,
+        embed_latency: str = "lognormal:0.15,0.4",
+        chat_latency: str = "lognormal:1.5,0.5",
+        dimensions: int = 256,
+        completion_words: int = 150,
+        seed: int = 0
+    ):
+        """
+        Initialize stub server
+
+        Args:
+            embed_latency: Latency spec for each embeddings request
+            chat_latency: Latency spec for each completion (time to first token when streaming)
+            dimensions: Embedding vector size
+            completion_words: Words per generated completion
+            seed: Random seed for latencies
+        """
+        self.embed_latency = parse_latency(embed_latency)
+        self.chat_latency = parse_latency(chat_latency)
+        self.dimensions = dimensions
+        self.completion_words = completion_words
+        self.requests = {"embeddings": 0, "chat": 0}
+        self.base_url: Optional[str] = None
+
+        self._rng = random.Random(seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> str:
+        """Start serving on a free localhost port and return the base URL"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self.base_url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/v1/models", self._models)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        app.router.add_post("/v1/chat/completions", self._chat)
+
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        self._loop.run_until_complete(web.SockSite(self._runner, sock).start())
+
+        self._thread = threading.Thread(target=self._loop.run_forever, name="stub-provider", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        """Shut the server down"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _vector(self, item) -> np.ndarray:
+        """Deterministic unit vector for a text or token list"""
+        key = item.encode("utf-8") if isinstance(item, str) else json.dumps(item).encode("utf-8")
+        vector = np.random.default_rng(zlib.crc32(key)).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def _completion_text(self, messages: List[Dict]) -> str:
+        rng = random.Random(zlib.crc32(json.dumps(messages).encode("utf-8")))
+        words = [rng.choice(_WORDS) for _ in range(self.completion_words)]
+        return (
+            "## Summary\n"
+            + " ".join(words[:self.completion_words // 2])
+            + " (Source: Page 1)\n\n## Details\n"
+            + " ".join(words[self.completion_words // 2:])
+            + " (Source: Page 2)"
+        )
+
+    async def _models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests["embeddings"] += 1
+        await asyncio.sleep(self.embed_latency(self._rng))
+
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        data = []
+        for index, item in enumerate(inputs):
+            vector = self._vector(item)
+            embedding = (
+                base64.b64encode(vector.tobytes()).decode("ascii")
+                if body.get("encoding_format") == "base64" else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        tokens = sum(len(item) if not isinstance(item, str) else len(item) // 4 for item in inputs)
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests["chat"] += 1
+        await asyncio.sleep(self.chat_latency(self._rng))
+
+        text = self._completion_text(body.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub")
+
+        if not body.get("stream"):
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(text) // 4, "total_tokens": len(text) // 4},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        words = text.split(" ")
+        for start in range(0, len(words), 8):
+            piece = " ".join(words[start:start + 8]) + " "
+            await response.write(self._sse_chunk(completion_id, model, {"content": piece}, None))
+            await asyncio.sleep(0.01)
+        await response.write(self._sse_chunk(completion_id, model, {}, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _sse_chunk(completion_id: str, model: str, delta: dict, finish_reason: Optional[str]) -> bytes:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def resident_memory_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _check_tokenizer():
+    """
+    Fail fast if tiktoken cannot load its encoding
+
+    OpenAIEmbeddings tokenizes inputs before sending them and tiktoken
+    downloads the encoding on first use, so an offline box needs a
+    pre-populated TIKTOKEN_CACHE_DIR; otherwise every upload would fail.
+    """
+    import tiktoken
+    try:
+        tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        raise ValueError(f"tiktoken could not load its encoding (set TIKTOKEN_CACHE_DIR when offline): {e}")
+
+
+def _upload(guide: bytes, filename: str, shared: bool) -> RAGEngine:
+    """Ingest the guide privately, or through the shared job manager like the app"""
+    buffer = io.BytesIO(guide)
+    buffer.name = filename
+
+    if not shared:
+        rag_engine = RAGEngine()
+        rag_engine.ingest_document(buffer)
+        return rag_engine
+
+    job = get_job_manager().submit(buffer, document_id=compute_digest(guide))
+    while job.is_active:
+        time.sleep(0.05)
+    if job.status != IngestJob.DONE:
+        raise ValueError(job.error)
+    return job.rag_engine
+
+
+def simulate_session(
+    session_index: int,
+    guide: bytes,
+    filename: str,
+    chat_turns: int,
+    shared_upload: bool,
+    stream: bool,
+    sectioned: Optional[bool]
+) -> Dict:
+    """
+    Run one simulated applicant: upload, chat turns, then a proposal
+
+    Args:
+        session_index: Used to vary questions between sessions
+        guide: Grant guide PDF bytes
+        filename: Guide filename
+        chat_turns: Questions asked before generating the proposal
+        shared_upload: Use the ingestion job manager (identical uploads shared)
+        stream: Use LLMService.stream_chat and also record time to first token
+        sectioned: Proposal mode override
+
+    Returns:
+        {"latencies": {op: [seconds]}, "errors": {op: count},
+         "messages": {op: first error}, "engine": RAGEngine}
+    """
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    messages: Dict[str, str] = {}
+
+    def record(op: str, started: float, failed: bool = False, message: str = ""):
+        latencies.setdefault(op, []).append(time.perf_counter() - started)
+        if failed:
+            errors[op] = errors.get(op, 0) + 1
+            messages.setdefault(op, message[:200])
+
+    session_started = time.perf_counter()
+
+    started = time.perf_counter()
+    try:
+        rag_engine = _upload(guide, filename, shared_upload)
+    except Exception as e:
+        record("upload", started, failed=True, message=str(e))
+        return {"latencies": latencies, "errors": errors, "messages": messages, "engine": None}
+    record("upload", started)
+
+    llm_service = LLMService(rag_engine, session_id=f"loadtest-{session_index}")
+    history = []
+    for turn in range(chat_turns):
+        question = CHAT_QUESTIONS[(session_index + turn) % len(CHAT_QUESTIONS)]
+        started = time.perf_counter()
+        if stream:
+            parts = []
+            for part in llm_service.stream_chat(question, history):
+                if not parts:
+                    record("chat_first_token", started)
+                parts.append(part)
+            answer = "".join(parts)
+        else:
+            answer = llm_service.chat(question, history)
+        record("chat", started, failed=answer.startswith("❌"), message=answer)
+        history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+    started = time.perf_counter()
+    proposal = llm_service.generate_proposal(**PROPOSAL_INPUT, sectioned=sectioned)
+    record("proposal", started, failed=proposal.startswith("❌"), message=proposal)
+
+    record("session", session_started)
+    return {"latencies": latencies, "errors": errors, "messages": messages, "engine": rag_engine}
+
+
+def run_level(
+    concurrency: int,
+    sessions: int,
+    guide: bytes,
+    filename: str,
+    chat_turns: int,
+    shared_upload: bool = False,
+    stream: bool = False,
+    sectioned: Optional[bool] = None,
+    stub: Optional[StubProviderServer] = None
+) -> Dict:
+    """
+    Run `sessions` simulated sessions with at most `concurrency` at once
+
+    Engines are kept until the level finishes, as lingering Streamlit
+    sessions keep theirs, so memory per session reflects resident indexes.
+
+    Returns:
+        Level summary: throughput, per-operation percentiles and error counts,
+        memory per session and stub request counts
+    """
+    gc.collect()
+    memory_before = resident_memory_bytes()
+    requests_before = dict(stub.requests) if stub else {}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as executor:
+        results = list(executor.map(
+            lambda index: simulate_session(
+                index, guide, filename, chat_turns, shared_upload, stream, sectioned
+            ),
+            range(sessions)
+        ))
+    elapsed = time.perf_counter() - started
+
+    memory_after = resident_memory_bytes()
+    engines = {id(result["engine"]): result["engine"] for result in results if result["engine"] is not None}
+    index_bytes = sum(engine.memory_usage()["total"] for engine in engines.values())
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    messages: Dict[str, str] = {}
+    for result in results:
+        for op, values in result["latencies"].items():
+            latencies.setdefault(op, []).extend(values)
+        for op, count in result["errors"].items():
+            errors[op] = errors.get(op, 0) + count
+        for op, message in result["messages"].items():
+            messages.setdefault(op, message)
+
+    operations = sum(len(values) for op, values in latencies.items() if op not in ("session", "chat_first_token"))
+    completed = sum(1 for result in results if "session" in result["latencies"])
+
+    summary = {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "completed_sessions": completed,
+        "elapsed_seconds": round(elapsed, 3),
+        "sessions_per_second": round(completed / elapsed, 3),
+        "operations_per_second": round(operations / elapsed, 3),
+        "operations": {
+            op: {
+                "count": len(values),
+                "errors": errors.get(op, 0),
+                "p50": round(percentile(values, 0.50), 3),
+                "p95": round(percentile(values, 0.95), 3),
+                "p99": round(percentile(values, 0.99), 3),
+            }
+            for op, values in sorted(latencies.items())
+        },
+        "rss_delta_mb_per_session": round((memory_after - memory_before) / sessions / 2 ** 20, 3),
+        "index_kb_per_session": round(index_bytes / sessions / 1024, 1),
+        "sample_errors": messages,
+    }
+    if stub:
+        summary["provider_requests"] = {
+            endpoint: count - requests_before.get(endpoint, 0) for endpoint, count in stub.requests.items()
+        }
+
+    del results, engines
+    return summary
+
+
+def print_report(levels: List[Dict]):
+    """Print one block per concurrency level"""
+    for level in levels:
+        print(
+            f"\nconcurrency={level['concurrency']}  sessions={level['completed_sessions']}/{level['sessions']}  "
+            f"elapsed={level['elapsed_seconds']:.1f}s  "
+            f"throughput={level['sessions_per_second']:.2f} sessions/s, {level['operations_per_second']:.2f} ops/s"
+        )
+        print(
+            f"  memory/session: RSS +{level['rss_delta_mb_per_session']:.2f} MB, "
+            f"index {level['index_kb_per_session']:.0f} KB"
+        )
+        if "provider_requests" in level:
+            requests = level["provider_requests"]
+            print(f"  provider calls: {requests['embeddings']} embeddings, {requests['chat']} chat")
+        print(f"  {'operation':<18}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for op, stats in level["operations"].items():
+            print(
+                f"  {op:<18}{stats['count']:>7}{stats['errors']:>8}"
+                f"{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}"
+            )
+        for op, message in level["sample_errors"].items():
+            print(f"  first {op} error: {message}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Load-test upload, chat and proposal generation against local provider stand-ins."
+    )
+    parser.add_argument("guide", help="Grant guide PDF uploaded by every simulated session")
+    parser.add_argument(
+        "--concurrency",
+        default="1,5,10",
+        help="Comma-separated concurrency levels to run in turn (default: 1,5,10)"
+    )
+    parser.add_argument(
+        "--sessions-per-level",
+        type=int,
+        help="Sessions per level (default: 2 x concurrency)"
+    )
+    parser.add_argument("--chat-turns", type=int, default=3, help="Chat questions per session (default: 3)")
+    parser.add_argument(
+        "--shared-upload",
+        action="store_true",
+        help="Upload through the ingestion job manager, so identical guides are ingested once"
+    )
+    parser.add_argument("--stream", action="store_true", help="Use streaming chat and record time to first token")
+    parser.add_argument(
+        "--sectioned",
+        action="store_true",
+        default=None,
+        help="Generate proposal sections concurrently (overrides PROPOSAL_MODE)"
+    )
+    parser.add_argument("--embed-latency", default="lognormal:0.15,0.4", help="Stub embeddings latency spec")
+    parser.add_argument("--chat-latency", default="lognormal:1.5,0.5", help="Stub chat latency spec")
+    parser.add_argument("--completion-words", type=int, default=150, help="Words per stub completion")
+    parser.add_argument(
+        "--no-rate-limit",
+        action="store_true",
+        help="Disable admission control (measure the app, not the configured provider budget)"
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(level) for level in args.concurrency.split(",")]
+        if any(level < 1 for level in levels):
+            raise ValueError
+    except ValueError:
+        parser.error("--concurrency must be a comma-separated list of positive integers")
+
+    try:
+        stub = StubProviderServer(
+            embed_latency=args.embed_latency,
+            chat_latency=args.chat_latency,
+            completion_words=args.completion_words
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        _check_tokenizer()
+        with open(args.guide, "rb") as guide_file:
+            guide = guide_file.read()
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    # Point the shared OpenAI clients at the stub before any are built
+    Config.LLM_PROVIDER = "openai"
+    Config.OPENAI_API_KEY = "stub-key"
+    Config.OPENAI_BASE_URL = stub.start()
+    Config.LLM_HEDGING_ENABLED = False
+    # CHAT_QUESTIONS overlap the standard FAQ questions; precomputed answers
+    # and the background FAQ traffic would both skew the chat latencies
+    Config.FAQ_ENABLED = False
+    if args.no_rate_limit:
+        Config.RATE_LIMIT_ENABLED = False
+    warm_up()
+
+    results = []
+    try:
+        for concurrency in levels:
+            sessions = args.sessions_per_level or 2 * concurrency
+            print(f"Running {sessions} sessions at concurrency {concurrency}...", file=sys.stderr)
+            results.append(run_level(
+                concurrency,
+                sessions,
+                guide,
+                os.path.basename(args.guide),
+                args.chat_turns,
+                shared_upload=args.shared_upload,
+                stream=args.stream,
+                sectioned=args.sectioned,
+                stub=stub
+            ))
+    finally:
+        stub.stop()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Index Memory Manager for GovGrant Assist
+Spills idle documents' indexes to disk so resident memory tracks active users
+
+Streamlit keeps every tab's session state alive long after the user walks
+away, and each session holds a RAGEngine. Engines registered here are checked
+periodically: those idle longer than Config.SPILL_IDLE_SECONDS, and then the
+least recently used ones while total resident memory exceeds
+Config.SPILL_MAX_RESIDENT_MB, are written to disk with RAGEngine.spill().
+The engine reloads itself on its next search, so sessions never notice.
+"""
+import threading
+import time
+import weakref
+from typing import Optional
+
+from config import Config
+from rag_engine import RAGEngine
+
+
+class IndexMemoryManager:
+    """
+    Tracks registered engines and spills idle ones on a background thread
+    Engines are held weakly: an engine nobody references is simply freed
+    """
+
+    def __init__(
+        self,
+        idle_seconds: float = None,
+        max_resident_mb: float = None,
+        check_interval: float = None,
+        directory: Optional[str] = None
+    ):
+        """
+        Initialize manager
+
+        Args:
+            idle_seconds: Idle time after which an engine is spilled
+            max_resident_mb: Resident budget across all engines
+            check_interval: Seconds between background sweeps
+            directory: Spill directory (system temp dir if unset)
+        """
+        self.idle_seconds = idle_seconds if idle_seconds is not None else Config.SPILL_IDLE_SECONDS
+        max_resident_mb = max_resident_mb if max_resident_mb is not None else Config.SPILL_MAX_RESIDENT_MB
+        self.max_resident_bytes = int(max_resident_mb * 1024 * 1024)
+        self.check_interval = check_interval or Config.SPILL_CHECK_INTERVAL
+        self.directory = directory or Config.SPILL_DIR
+        self.spilled_total = 0
+
+        self._engines: "weakref.WeakSet[RAGEngine]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def register(self, engine: RAGEngine):
+        """Start tracking an engine (registering twice is harmless)"""
+        with self._lock:
+            self._engines.add(engine)
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._run, name="index-memory", daemon=True)
+                self._sweeper.start()
+
+        # A new upload may push the process over budget right away
+        if self.resident_bytes() > self.max_resident_bytes:
+            self.sweep()
+
+    def _tracked(self):
+        with self._lock:
+            return list(self._engines)
+
+    def resident_bytes(self) -> int:
+        """Approximate memory held by all resident engines"""
+        return sum(engine.memory_usage()["total"] for engine in self._tracked())
+
+    def sweep(self) -> int:
+        """
+        Spill idle engines, then least recently used ones while over budget
+
+        Returns:
+            Number of engines spilled
+        """
+        now = time.time()
+        resident = [
+            (engine, engine.memory_usage()["total"])
+            for engine in self._tracked() if not engine.is_spilled
+        ]
+        resident.sort(key=lambda item: item[0].last_access)
+        total = sum(size for _, size in resident)
+
+        spilled = 0
+        for engine, size in resident:
+            if now - engine.last_access < self.idle_seconds and total <= self.max_resident_bytes:
+                continue
+            released = engine.spill(self.directory)
+            if released:
+                total -= released
+                spilled += 1
+
+        self.spilled_total += spilled
+        return spilled
+
+    def stats(self) -> dict:
+        """Counts of tracked, resident and spilled engines and resident bytes"""
+        engines = self._tracked()
+        spilled = sum(1 for engine in engines if engine.is_spilled)
+        return {
+            "engines": len(engines),
+            "resident": len(engines) - spilled,
+            "spilled": spilled,
+            "resident_bytes": sum(engine.memory_usage()["total"] for engine in engines),
+            "spilled_total": self.spilled_total,
+        }
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.sweep()
+            except Exception:
+                pass  # A failed spill (e.g. disk full) just leaves the engine resident
+
+
+_manager: Optional[IndexMemoryManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_memory_manager() -> IndexMemoryManager:
+    """Return the process-wide memory manager, creating it on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = IndexMemoryManager()
+        return _manager
+
+
+def track(engine: RAGEngine):
+    """Register an engine with the memory manager when spilling is enabled"""
+    if Config.SPILL_ENABLED:
+        get_memory_manager().register(engine)
@@ -3,14 +3,49 @@ RAG Engine for GovGrant Assist
 Handles document ingestion, chunking, embedding, and retrieval
 Implements specifications from PRD Section 3.3
 """
-from typing import List, Optional, Tuple
+import contextlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+import faiss
+import numpy as np
 import pypdf
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from clients import get_embeddings
 from config import Config
+from utils.chunk_store import ChunkStore
+from utils.digest import compute_digest
+from utils.single_flight import fingerprint, shared_flight
+from utils.sections import build_sections, detect_headings, extract_outline
+from utils.text_cleaning import MinHashDeduplicator, strip_repeated_lines
+
+
+class CoalescingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that routes calls through the process-wide single-flight
+    group, so concurrent identical embedding requests share one API call
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        key = fingerprint("embed_documents", self.model, texts)
+        return shared_flight.do(key, lambda: self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        key = fingerprint("embed_query", self.model, text)
+        return shared_flight.do(key, lambda: self.embeddings.embed_query(text))
 
 
 class RAGEngine:
@@ -19,24 +54,42 @@ class RAGEngine:
     Handles document processing and semantic search
     """
 
-    def __init__(self):
-        """Initialize RAG engine with embeddings"""
+    def __init__(self, config=None):
+        """
+        Initialize RAG engine with embeddings
+
+        Args:
+            config: Config class to read settings from (defaults to Config);
+                a subclass can override settings for this engine only
+        """
         self.vector_store = None
-        self.documents = []
-        self.config = Config
+        self.config = config or Config
 
-        # Initialize embeddings based on provider
-        if self.config.LLM_PROVIDER == "openai":
-            self.embeddings = OpenAIEmbeddings(
-                openai_api_key=self.config.OPENAI_API_KEY
-            )
-        elif self.config.LLM_PROVIDER == "google":
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=self.config.GOOGLE_API_KEY
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.config.LLM_PROVIDER}")
+        # Coarse level of the hierarchical index: page-range sections and a
+        # FAISS index over their centroid vectors (row i = self.sections[i])
+        self.sections = []
+        self.section_index = None
+
+        # Content hash of each (cleaned) page, used to diff revised versions
+        self.page_hashes: Dict[int, str] = {}
+
+        # Precomputed answers to standard questions (faq.PrecomputedFAQ),
+        # attached in the background after ingestion
+        self.faq = None
+
+        # Residency: an idle engine's index may be spilled to disk (see
+        # spill()) and is reloaded by the next operation that needs it
+        self.last_access = time.time()
+        self._residency_lock = threading.RLock()
+        self._pins = 0
+        self._spill_path: Optional[str] = None
+        self._spill_cleanup = None
+
+        # Shared, pooled embeddings client for the configured provider
+        self.embeddings = get_embeddings(self.config.LLM_PROVIDER)
+
+        if self.config.SINGLE_FLIGHT_ENABLED:
+            self.embeddings = CoalescingEmbeddings(self.embeddings)
 
     def extract_text_from_pdf(self, file_buffer) -> Tuple[str, dict]:
         """
@@ -54,7 +107,8 @@ class RAGEngine:
             metadata = {
                 "filename": file_buffer.name,
                 "total_pages": len(pdf_reader.pages),
-                "page_texts": []
+                "page_texts": [],
+                "outline": extract_outline(pdf_reader)
             }
 
             for page_num, page in enumerate(pdf_reader.pages, start=1):
@@ -138,41 +192,522 @@ class RAGEngine:
 
         return 1  # Default to page 1 if not found
 
-    def ingest_document(self, file_buffer) -> dict:
+    def _strip_boilerplate(self, metadata: dict) -> Tuple[str, int]:
         """
-        Main ingestion pipeline: PDF -> Text -> Chunks -> Vectors
+        Remove lines repeated across pages (headers, footers, page numbers)
+        Updates metadata["page_texts"] in place and rebuilds the full text
 
         Args:
-            file_buffer: Streamlit uploaded file
+            metadata: Document metadata with page texts
 
         Returns:
-            Ingestion statistics
+            Tuple of (cleaned_full_text, removed_line_count)
+        """
+        page_infos = metadata["page_texts"]
+        cleaned, removed = strip_repeated_lines(
+            [page_info["text"] for page_info in page_infos],
+            min_page_fraction=self.config.BOILERPLATE_MIN_PAGE_FRACTION
+        )
+
+        text_content = []
+        for page_info, page_text in zip(page_infos, cleaned):
+            page_info["text"] = page_text
+            text_content.append(f"--- Page {page_info['page']} ---\n{page_text}")
+
+        return "\n\n".join(text_content), removed
+
+    def _deduplicate_chunks(self, documents: List[Document]) -> Tuple[List[Document], int]:
+        """
+        Drop chunks that exactly or nearly duplicate an earlier chunk
+
+        Args:
+            documents: Chunked documents in order
+
+        Returns:
+            Tuple of (kept_documents, removed_count); chunk ids are renumbered
+        """
+        deduplicator = MinHashDeduplicator(threshold=self.config.DEDUP_SIMILARITY_THRESHOLD)
+        duplicates = set(deduplicator.find_duplicates([doc.page_content for doc in documents]))
+
+        kept = [doc for i, doc in enumerate(documents) if i not in duplicates]
+        for i, doc in enumerate(kept):
+            doc.metadata["chunk_id"] = i
+            doc.metadata["total_chunks"] = len(kept)
+
+        return kept, len(duplicates)
+
+    def _assign_sections(self, documents: List[Document], metadata: dict) -> List[dict]:
+        """
+        Split the document into sections and tag each chunk with its section
+        Sections come from the PDF outline, else detected headings, else
+        fixed page windows. Sections without chunks are dropped.
+
+        Args:
+            documents: Chunks in index order (tagged in place with "section_id")
+            metadata: Document metadata with outline and page texts
+
+        Returns:
+            Sections as {"title", "start_page", "end_page", "chunk_ids"} dicts
+        """
+        starts = metadata.get("outline") or detect_headings(metadata["page_texts"])
+        sections = build_sections(starts, metadata["total_pages"], self.config.SECTION_PAGE_WINDOW)
+
+        page_to_section = {}
+        for section_id, section in enumerate(sections):
+            section["chunk_ids"] = []
+            for page in range(section["start_page"], section["end_page"] + 1):
+                page_to_section[page] = section_id
+
+        for chunk_index, doc in enumerate(documents):
+            section_id = page_to_section.get(doc.metadata.get("page"), 0)
+            sections[section_id]["chunk_ids"].append(chunk_index)
+
+        sections = [section for section in sections if section["chunk_ids"]]
+        for section_id, section in enumerate(sections):
+            for chunk_index in section["chunk_ids"]:
+                documents[chunk_index].metadata["section_id"] = section_id
+                documents[chunk_index].metadata["section"] = section["title"]
+
+        return sections
+
+    def _build_section_index(self, vector_store: FAISS, sections: List[dict]):
+        """
+        Build the coarse index: one centroid vector per section
+
+        Centroids are averaged from the already-embedded chunk vectors, so
+        the coarse level costs no extra embedding calls.
+        """
+        vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+        centroids = np.stack([
+            vectors[section["chunk_ids"]].mean(axis=0) for section in sections
+        ]).astype(np.float32)
+
+        section_index = faiss.IndexFlatL2(centroids.shape[1])
+        section_index.add(centroids)
+        return section_index
+
+    def _hierarchical_search(self, embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        """
+        Two-level search: rank sections, then rank chunks only inside the best ones
+        Only the chunk vectors of the chosen sections are read and compared, so
+        the work per query follows the size of those sections, not the guide
+
+        Args:
+            embedding: Query vector
+            k: Number of results
+
+        Returns:
+            List of (Document, distance) tuples
+        """
+        query_vector = np.array([embedding], dtype=np.float32)
+
+        # Take the top sections, widening until they hold at least k chunks
+        _, section_order = self.section_index.search(query_vector, len(self.sections))
+        chunk_ids = []
+        for rank, section_id in enumerate(section_order[0]):
+            if section_id < 0 or (rank >= self.config.HIERARCHY_TOP_SECTIONS and len(chunk_ids) >= k):
+                break
+            chunk_ids.extend(self.sections[section_id]["chunk_ids"])
+
+        # Squared L2 over the candidates only, matching IndexFlatL2's distances
+        chunk_ids = np.array(chunk_ids, dtype=np.int64)
+        candidates = self.vector_store.index.reconstruct_batch(chunk_ids)
+        distances = ((candidates - query_vector) ** 2).sum(axis=1)
+        top = np.argsort(distances, kind="stable")[:k]
+
+        results = []
+        for position in top:
+            index = int(chunk_ids[position])
+            doc = self.vector_store.docstore.search(self.vector_store.index_to_docstore_id[index])
+            results.append((doc, float(distances[position])))
+        return results
+
+    def _prepare_documents(
+        self,
+        file_buffer,
+        report: Callable[[float, str], None]
+    ) -> Tuple[str, List[Document], dict]:
+        """
+        Extract, clean, chunk and section a PDF, ready for embedding
+
+        Args:
+            file_buffer: Uploaded PDF buffer
+            report: Progress callback(fraction, message)
+
+        Returns:
+            Tuple of (text, documents, stats): the cleaned full text the
+            chunks were split from, chunks carrying section metadata, and
+            document-level ingestion statistics
         """
         # Extract text
+        report(0.0, "Extracting text")
         text, metadata = self.extract_text_from_pdf(file_buffer)
 
         if not text or len(text.strip()) == 0:
             raise ValueError("No text could be extracted from PDF")
 
+        # Strip running headers/footers so they don't pollute every chunk
+        boilerplate_lines = 0
+        if self.config.STRIP_BOILERPLATE:
+            text, boilerplate_lines = self._strip_boilerplate(metadata)
+
         # Chunk text
+        report(0.1, "Chunking text")
         documents = self.chunk_text(text, metadata)
-        self.documents = documents
 
-        # Create vector store using FAISS
-        self.vector_store = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
-        )
+        # Drop exact and near-duplicate chunks before paying to embed them
+        duplicate_chunks = 0
+        if self.config.DEDUPLICATE_CHUNKS:
+            documents, duplicate_chunks = self._deduplicate_chunks(documents)
+
+        # Group chunks into sections for the coarse level of the index
+        sections = []
+        if self.config.HIERARCHICAL_INDEX:
+            sections = self._assign_sections(documents, metadata)
 
         stats = {
             "filename": metadata["filename"],
             "total_pages": metadata["total_pages"],
             "total_chunks": len(documents),
-            "total_characters": len(text)
+            "total_characters": len(text),
+            "boilerplate_lines_removed": boilerplate_lines,
+            "duplicate_chunks_removed": duplicate_chunks,
+            "total_sections": len(sections),
+            "sections": sections,
+            "page_hashes": {
+                page_info["page"]: compute_digest(page_info["text"].encode("utf-8"))
+                for page_info in metadata["page_texts"]
+            }
         }
+        return text, documents, stats
+
+    @staticmethod
+    def _chunk_ids(documents: List[Document]) -> List[str]:
+        """
+        Content-addressed docstore ids for chunks
+
+        A chunk's id is the hash of its text, so an unchanged chunk in a
+        revised document maps to the vector already stored for it. Repeated
+        texts get an occurrence suffix to keep ids unique.
+        """
+        seen = Counter()
+        ids = []
+        for doc in documents:
+            digest = compute_digest(doc.page_content.encode("utf-8"))
+            ids.append(f"{digest}:{seen[digest]}" if seen[digest] else digest)
+            seen[digest] += 1
+        return ids
+
+    @staticmethod
+    def _chunk_store(text: str, documents: List[Document], ids: List[str]) -> ChunkStore:
+        """Register chunks, in order, as offsets into the shared text buffer"""
+        chunk_store = ChunkStore(text)
+        chunk_store.add(dict(zip(ids, documents)))
+        return chunk_store
+
+    def ingest_document(
+        self,
+        file_buffer,
+        progress_callback: Optional[Callable[[float, str], None]] = None
+    ) -> dict:
+        """
+        Main ingestion pipeline: PDF -> Text -> Chunks -> Vectors
+
+        Args:
+            file_buffer: Streamlit uploaded file
+            progress_callback: Optional callable(fraction, message) invoked as
+                ingestion advances (fraction runs from 0.0 to 1.0)
+
+        Returns:
+            Ingestion statistics
+        """
+        def report(fraction: float, message: str):
+            if progress_callback:
+                progress_callback(fraction, message)
+
+        text, documents, stats = self._prepare_documents(file_buffer, report)
+        sections = stats.pop("sections")
+        page_hashes = stats.pop("page_hashes")
+        ids = self._chunk_ids(documents)
+        chunk_store = self._chunk_store(text, documents, ids)
+
+        # Create vector store using FAISS, embedding in batches so progress
+        # can be reported; the engine only becomes ready once all are in.
+        # Chunks live in the compact store, so FAISS keeps no text copies.
+        vector_store = None
+        batch_size = self.config.EMBEDDING_BATCH_SIZE
+        for start in range(0, len(documents), batch_size):
+            report(
+                0.15 + 0.85 * start / len(documents),
+                f"Embedding chunks {start + 1}-{min(start + batch_size, len(documents))} of {len(documents)}"
+            )
+            batch = documents[start:start + batch_size]
+            texts = [doc.page_content for doc in batch]
+            vectors = self.embeddings.embed_documents(texts)
+            if vector_store is None:
+                vector_store = FAISS(
+                    embedding_function=self.embeddings,
+                    index=faiss.IndexFlatL2(len(vectors[0])),
+                    docstore=chunk_store,
+                    index_to_docstore_id={}
+                )
+            vector_store.add_embeddings(
+                list(zip(texts, vectors)),
+                metadatas=[doc.metadata for doc in batch],
+                ids=ids[start:start + batch_size]
+            )
+
+        section_index = self._build_section_index(vector_store, sections) if sections else None
+
+        with self._residency_lock:
+            self._discard_spill()
+            self.vector_store = vector_store
+            self.sections = sections
+            self.section_index = section_index
+            self.page_hashes = page_hashes
+            self.faq = None
+            self.last_access = time.time()
+        report(1.0, "Done")
 
         return stats
 
+    def reingest_document(
+        self,
+        file_buffer,
+        progress_callback: Optional[Callable[[float, str], None]] = None
+    ) -> dict:
+        """
+        Update the index in place for a revised version of the ingested document
+
+        The revision is chunked as usual and diffed against the current
+        index by chunk content hash: only new or changed chunks are embedded,
+        unchanged chunks keep their vectors (with page/section metadata
+        refreshed), and vectors of chunks no longer present are deleted.
+        Falls back to a full ingestion when nothing has been ingested yet.
+
+        Args:
+            file_buffer: Revised PDF buffer
+            progress_callback: Optional callable(fraction, message)
+
+        Returns:
+            Ingestion statistics, plus a "changes" dict describing the diff
+        """
+        # Pinned: the index must stay resident while it is being modified
+        with self._resident():
+            if not self.vector_store:
+                return self.ingest_document(file_buffer, progress_callback)
+
+            def report(fraction: float, message: str):
+                if progress_callback:
+                    progress_callback(fraction, message)
+
+            text, documents, stats = self._prepare_documents(file_buffer, report)
+            sections = stats.pop("sections")
+            page_hashes = stats.pop("page_hashes")
+            ids = self._chunk_ids(documents)
+
+            vector_store = self.vector_store
+            existing_ids = set(vector_store.index_to_docstore_id.values())
+            new_ids = set(ids)
+            added = [(doc, doc_id) for doc, doc_id in zip(documents, ids) if doc_id not in existing_ids]
+            removed = [doc_id for _, doc_id in sorted(vector_store.index_to_docstore_id.items()) if doc_id not in new_ids]
+
+            # Embed everything first, so a failed call leaves the index untouched
+            vectors = []
+            batch_size = self.config.EMBEDDING_BATCH_SIZE
+            for start in range(0, len(added), batch_size):
+                report(
+                    0.15 + 0.8 * start / len(added),
+                    f"Embedding changed chunks {start + 1}-{min(start + batch_size, len(added))} of {len(added)}"
+                )
+                vectors.extend(self.embeddings.embed_documents(
+                    [doc.page_content for doc, _ in added[start:start + batch_size]]
+                ))
+
+            # The revision gets its own chunk store, so reused chunks pick up
+            # their new page/section metadata; the old store is left untouched
+            # for any other engine that shares it
+            report(0.95, "Updating index")
+            vector_store.docstore = self._chunk_store(text, documents, ids)
+            if removed:
+                vector_store.delete(removed)
+            if added:
+                vector_store.add_embeddings(
+                    [(doc.page_content, vector) for (doc, _), vector in zip(added, vectors)],
+                    metadatas=[doc.metadata for doc, _ in added],
+                    ids=[doc_id for _, doc_id in added]
+                )
+
+            # Chunk order no longer matches FAISS order, so remap section members
+            position = {doc_id: index for index, doc_id in vector_store.index_to_docstore_id.items()}
+            for section in sections:
+                section["chunk_ids"] = [position[ids[chunk_index]] for chunk_index in section["chunk_ids"]]
+            section_index = self._build_section_index(vector_store, sections) if sections else None
+
+            changed_pages = sorted(
+                page for page, digest in page_hashes.items()
+                if page in self.page_hashes and self.page_hashes[page] != digest
+            )
+            stats["changes"] = {
+                "pages_added": len(page_hashes.keys() - self.page_hashes.keys()),
+                "pages_removed": len(self.page_hashes.keys() - page_hashes.keys()),
+                "changed_pages": changed_pages,
+                "chunks_added": len(added),
+                "chunks_removed": len(removed),
+                "chunks_reused": len(documents) - len(added)
+            }
+
+            self.sections = sections
+            self.section_index = section_index
+            self.page_hashes = page_hashes
+            self.faq = None  # Answers may cite pages that changed
+            report(1.0, "Done")
+
+            return stats
+
+    def clone(self) -> "RAGEngine":
+        """
+        Copy this engine so it can be revised without affecting sessions
+        still using the original; vectors are copied, not re-embedded
+
+        Returns:
+            Independent RAGEngine over the same content
+        """
+        engine = RAGEngine(self.config)
+        with self._resident():
+            if self.vector_store is not None:
+                docstore_ids = self.vector_store.index_to_docstore_id
+                engine.vector_store = FAISS(
+                    embedding_function=engine.embeddings,
+                    index=faiss.clone_index(self.vector_store.index),
+                    docstore=self.vector_store.docstore.copy(),
+                    index_to_docstore_id=dict(docstore_ids)
+                )
+            engine.sections = [dict(section) for section in self.sections]
+            engine.section_index = faiss.clone_index(self.section_index) if self.section_index is not None else None
+            engine.page_hashes = dict(self.page_hashes)
+        return engine
+
+    @contextlib.contextmanager
+    def _resident(self):
+        """
+        Keep the index in memory for the duration of the block
+        Reloads it first if it was spilled, and prevents spilling until the
+        block exits
+        """
+        with self._residency_lock:
+            if self._spill_path is not None:
+                self._reload()
+            self._pins += 1
+            self.last_access = time.time()
+        try:
+            yield
+        finally:
+            with self._residency_lock:
+                self._pins -= 1
+
+    @property
+    def is_spilled(self) -> bool:
+        """True while the index is on disk rather than in memory"""
+        return self._spill_path is not None
+
+    def spill(self, directory: Optional[str] = None) -> int:
+        """
+        Write the index, chunks and sections to disk and release them
+        Does nothing if the engine is empty, already spilled or in use.
+
+        Args:
+            directory: Where to write the spill file (system temp dir if None)
+
+        Returns:
+            Approximate bytes released (0 if nothing was spilled)
+        """
+        with self._residency_lock:
+            if self.vector_store is None or self._pins:
+                return 0
+
+            released = self.memory_usage()["total"]
+            state = {
+                "index": faiss.serialize_index(self.vector_store.index),
+                "index_to_docstore_id": self.vector_store.index_to_docstore_id,
+                "docstore": self.vector_store.docstore,
+                "sections": self.sections,
+                "section_index": (
+                    faiss.serialize_index(self.section_index) if self.section_index is not None else None
+                ),
+            }
+
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(prefix="govgrant-index-", suffix=".pkl", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as spill_file:
+                    pickle.dump(state, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                os.remove(path)
+                raise
+
+            self._spill_path = path
+            # Remove the file if the engine is garbage collected while spilled
+            self._spill_cleanup = weakref.finalize(self, _remove_file, path)
+            self.vector_store = None
+            self.sections = []
+            self.section_index = None
+            return released
+
+    def _reload(self):
+        """Load a spilled index back into memory (residency lock held)"""
+        with open(self._spill_path, "rb") as spill_file:
+            state = pickle.load(spill_file)
+
+        self.vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.deserialize_index(state["index"]),
+            docstore=state["docstore"],
+            index_to_docstore_id=state["index_to_docstore_id"]
+        )
+        self.sections = state["sections"]
+        if state["section_index"] is not None:
+            self.section_index = faiss.deserialize_index(state["section_index"])
+        self._discard_spill()
+
+    def _discard_spill(self):
+        """Delete the spill file, if any (residency lock held)"""
+        if self._spill_cleanup is not None:
+            self._spill_cleanup()
+        self._spill_path = None
+        self._spill_cleanup = None
+
+    def memory_usage(self) -> dict:
+        """
+        Approximate memory held by this engine's index and chunks
+
+        Returns:
+            Bytes by component ("vectors", "chunks", "sections") and "total";
+            all zero while spilled
+        """
+        with self._residency_lock:
+            usage = {"vectors": 0, "chunks": 0, "sections": 0}
+            if self.vector_store is not None:
+                index = self.vector_store.index
+                usage["vectors"] = index.ntotal * getattr(index, "code_size", index.d * 4)
+                usage["chunks"] = (
+                    self.vector_store.docstore.nbytes()
+                    + sys.getsizeof(self.vector_store.index_to_docstore_id)
+                )
+            if self.section_index is not None:
+                usage["vectors"] += self.section_index.ntotal * self.section_index.code_size
+            usage["sections"] = sum(
+                sys.getsizeof(section["chunk_ids"]) + 28 * len(section["chunk_ids"])
+                for section in self.sections
+            )
+            usage["total"] = sum(usage.values())
+            return usage
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, e.g. to reuse the vector across several lookups"""
+        return self.embeddings.embed_query(query)
+
     def similarity_search(self, query: str, k: Optional[int] = None) -> List[Tuple[Document, float]]:
         """
         Perform semantic search in vector store
@@ -184,28 +719,66 @@ class RAGEngine:
         Returns:
             List of (Document, similarity_score) tuples
         """
-        if not self.vector_store:
+        if not self.is_ready():
             raise ValueError("No document has been ingested. Please upload a PDF first.")
+        return self.similarity_search_by_vector(self.embed_query(query), k)
 
-        k = k or self.config.TOP_K_RESULTS
-
-        # Use similarity_search_with_score for better citation
-        results = self.vector_store.similarity_search_with_score(query, k=k)
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: Optional[int] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Semantic search with an already embedded query
 
-        return results
+        Args:
+            embedding: Query vector from embed_query()
+            k: Number of results (defaults to Config.TOP_K_RESULTS)
 
-    def get_relevant_context(self, query: str, k: Optional[int] = None) -> str:
+        Returns:
+            List of (Document, similarity_score) tuples
+        """
+        with self._resident():
+            if not self.vector_store:
+                raise ValueError("No document has been ingested. Please upload a PDF first.")
+
+            k = k or self.config.TOP_K_RESULTS
+
+            # Very long documents: search within the most relevant sections only.
+            # Below the threshold a flat scan is already cheap and sees every chunk
+            if (
+                self.section_index is not None
+                and len(self.sections) > self.config.HIERARCHY_TOP_SECTIONS
+                and self.vector_store.index.ntotal >= self.config.HIERARCHY_MIN_CHUNKS
+            ):
+                return self._hierarchical_search(embedding, k)
+
+            # Use similarity_search_with_score for better citation
+            results = self.vector_store.similarity_search_with_score_by_vector(embedding, k=k)
+
+            return results
+
+    def get_relevant_context(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> str:
         """
         Get formatted context for LLM prompting
 
         Args:
             query: User query
             k: Number of chunks to retrieve
+            query_vector: Query embedding, if already computed
 
         Returns:
             Formatted context string with citations
         """
-        results = self.similarity_search(query, k)
+        if query_vector is not None:
+            results = self.similarity_search_by_vector(query_vector, k)
+        else:
+            results = self.similarity_search(query, k)
 
         if not results:
             return "No relevant information found in the document."
@@ -223,9 +796,29 @@ class RAGEngine:
 
     def clear(self):
         """Clear vector store and documents (for session reset)"""
-        self.vector_store = None
-        self.documents = []
+        with self._residency_lock:
+            self._discard_spill()
+            self.vector_store = None
+            self.sections = []
+            self.section_index = None
+            self.page_hashes = {}
+            self.faq = None
+
+    @property
+    def documents(self) -> List[Document]:
+        """Ingested chunks in document order, materialized from the chunk store"""
+        with self._resident():
+            if self.vector_store is None:
+                return []
+            return self.vector_store.docstore.documents()
 
     def is_ready(self) -> bool:
-        """Check if engine has documents loaded"""
-        return self.vector_store is not None
+        """Check if engine has documents loaded (in memory or spilled)"""
+        return self.vector_store is not None or self._spill_path is not None
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,293 @@
+"""
+Sharded Library Index for GovGrant Assist
+Scatter-gather retrieval across worker processes for cross-scheme search
+
+A single RAGEngine keeps its whole FAISS index in one process and searches
+it under the GIL. ShardedIndex spreads the chunks of every document added to
+it across Config.SHARD_COUNT worker processes (utils.shard_worker), each
+holding one FAISS shard. A query is embedded once, sent to every shard in
+parallel, and the per-shard top-k lists are merged into a global top-k. A
+shard that errors or misses Config.SHARD_TIMEOUT is skipped for that query
+(results are then partial) and reported as unhealthy by health().
+"""
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from clients import get_embeddings
+from config import Config
+from rag_engine import RAGEngine
+from utils.shard_worker import serve
+
+
+# Spawned workers re-import the parent's __main__ module, which can take a while
+_STARTUP_TIMEOUT = 60.0
+
+
+class ShardClient:
+    """Parent-side handle for one shard process"""
+
+    def __init__(self, shard_id: int, context, window: int = 200):
+        self.shard_id = shard_id
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=serve, args=(child_conn,), name=f"index-shard-{shard_id}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        self.vectors = 0
+        self.healthy = True
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+
+    def call(self, operation: str, payload=None, timeout: float = None):
+        """
+        Send one request and wait for its reply
+
+        Args:
+            operation: "add", "search", "remove", "ping" or "stop"
+            payload: Operation arguments
+            timeout: Seconds to wait for the reply
+
+        Returns:
+            The shard's result
+
+        Raises:
+            TimeoutError: If the shard did not reply in time
+            RuntimeError: If the shard is down or reported an error
+        """
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                if not self.process.is_alive():
+                    raise RuntimeError("shard process is not running")
+
+                request_id = next(self._request_ids)
+                self._conn.send((request_id, operation, payload))
+                deadline = started + (timeout if timeout is not None else Config.SHARD_TIMEOUT)
+
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self._conn.poll(remaining):
+                        raise TimeoutError(f"no reply within {timeout or Config.SHARD_TIMEOUT:g}s")
+                    reply_id, status, result = self._conn.recv()
+                    if reply_id == request_id:
+                        break
+                    # A reply to an earlier request that timed out; discard it
+
+            if status != "ok":
+                raise RuntimeError(result)
+        except Exception as e:
+            self.healthy = False
+            self.errors += 1
+            self.last_error = f"{operation}: {e}"
+            raise
+
+        self.healthy = True
+        self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def health(self) -> dict:
+        """Liveness, size and recent latency of this shard"""
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(1000 * latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 2)
+
+        return {
+            "shard": self.shard_id,
+            "alive": self.process.is_alive(),
+            "healthy": self.healthy and self.process.is_alive(),
+            "vectors": self.vectors,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        try:
+            self.call("stop", timeout=2.0)
+        except Exception:
+            pass
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
+
+
+class ShardedIndex:
+    """
+    Library-wide vector index partitioned across worker processes
+    Chunks are dealt round-robin over the shards, so shard sizes stay even
+    """
+
+    def __init__(self, num_shards: int = None, embeddings=None):
+        """
+        Start the shard processes
+
+        Args:
+            num_shards: Worker processes (defaults to Config.SHARD_COUNT)
+            embeddings: Embeddings client for queries (configured provider's by default)
+        """
+        num_shards = num_shards or Config.SHARD_COUNT
+        # "spawn" so workers don't inherit this process's threads and locks
+        context = multiprocessing.get_context("spawn")
+        self.shards = [ShardClient(shard_id, context) for shard_id in range(num_shards)]
+        self.embeddings = embeddings or get_embeddings(Config.LLM_PROVIDER)
+        self.documents: Dict[str, int] = {}
+
+        self._executor = ThreadPoolExecutor(max_workers=4 * num_shards, thread_name_prefix="shard-call")
+        self._lock = threading.Lock()
+        self._next_shard = 0
+
+        # Wait until every worker is serving so the first query isn't timed out
+        self._scatter({shard: ("ping", None, _STARTUP_TIMEOUT) for shard in self.shards})
+
+    def _scatter(self, calls: Dict[ShardClient, tuple]) -> Dict[ShardClient, object]:
+        """Run one call per shard in parallel; failed shards are left out"""
+        futures = {
+            shard: self._executor.submit(shard.call, *args)
+            for shard, args in calls.items()
+        }
+        results = {}
+        for shard, future in futures.items():
+            try:
+                results[shard] = future.result()
+            except Exception:
+                pass  # Recorded on the shard; health() reports it
+        return results
+
+    def add_document(self, document_id: str, vectors: np.ndarray, documents: List[Document]) -> int:
+        """
+        Distribute a document's chunk vectors over the shards
+
+        Args:
+            document_id: Library-unique document id (e.g. content digest)
+            vectors: Chunk vectors, one row per document
+            documents: Chunks matching the vector rows
+
+        Returns:
+            Number of chunks added (0 if the document was already present)
+
+        Raises:
+            RuntimeError: If any shard failed to store its part
+        """
+        with self._lock:
+            if document_id in self.documents:
+                return 0
+            self.documents[document_id] = len(documents)
+            offset = self._next_shard
+            self._next_shard = (self._next_shard + len(documents)) % len(self.shards)
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        calls = {}
+        for position, shard in enumerate(self.shards):
+            rows = list(range((position - offset) % len(self.shards), len(documents), len(self.shards)))
+            if rows:
+                records = [(document_id, documents[row].page_content, documents[row].metadata) for row in rows]
+                calls[shard] = ("add", (vectors[rows], records))
+
+        results = self._scatter(calls)
+        for shard, total in results.items():
+            shard.vectors = total
+
+        if len(results) < len(calls):
+            self.remove_document(document_id)
+            raise RuntimeError(f"Could not add document {document_id[:12]} to every shard")
+        return len(documents)
+
+    def add_engine(self, document_id: str, rag_engine: RAGEngine) -> int:
+        """
+        Add an ingested document, reusing the engine's vectors (no re-embedding)
+
+        Args:
+            document_id: Library-unique document id
+            rag_engine: Engine the document was ingested into
+
+        Returns:
+            Number of chunks added
+        """
+        if document_id in self.documents:
+            return 0
+
+        with rag_engine._resident():
+            vector_store = rag_engine.vector_store
+            if vector_store is None:
+                raise ValueError("No document has been ingested into this engine.")
+            vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+            documents = [
+                vector_store.docstore.search(vector_store.index_to_docstore_id[row])
+                for row in range(vector_store.index.ntotal)
+            ]
+        return self.add_document(document_id, vectors, documents)
+
+    def remove_document(self, document_id: str):
+        """Remove a document's chunks from every shard"""
+        with self._lock:
+            self.documents.pop(document_id, None)
+
+        results = self._scatter({shard: ("remove", document_id) for shard in self.shards})
+        for shard, total in results.items():
+            shard.vectors = total
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """
+        Search the whole library
+
+        Args:
+            query: User query
+            k: Number of results (defaults to Config.TOP_K_RESULTS)
+
+        Returns:
+            Global top-k (Document, distance) tuples; metadata includes document_id
+        """
+        vector = np.array([self.embeddings.embed_query(query)], dtype=np.float32)
+        return self.search_by_vector(vector, k)
+
+    def search_by_vector(self, vector: np.ndarray, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """Scatter a query vector to every shard and merge the top-k"""
+        k = k or Config.TOP_K_RESULTS
+        results = self._scatter({
+            shard: ("search", (vector, k)) for shard in self.shards if shard.process.is_alive()
+        })
+
+        best = heapq.nsmallest(
+            k,
+            (hit for hits in results.values() for hit in hits),
+            key=lambda hit: hit[0]
+        )
+        return [
+            (Document(page_content=text, metadata={**metadata, "document_id": document_id}), distance)
+            for distance, (document_id, text, metadata) in best
+        ]
+
+    def health(self) -> dict:
+        """Per-shard health and latency, plus library totals"""
+        shards = [shard.health() for shard in self.shards]
+        return {
+            "documents": len(self.documents),
+            "vectors": sum(shard["vectors"] for shard in shards if shard["alive"]),
+            "healthy_shards": sum(1 for shard in shards if shard["healthy"]),
+            "shards": shards,
+        }
+
+    def close(self):
+        """Stop every shard process"""
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown(wait=False)
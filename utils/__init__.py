@@ -1,4 +1,5 @@
 """Utility modules for GovGrant Assist"""
 from .validators import FileValidator, FormValidator
+from .digest import compute_digest, file_digest
 
-__all__ = ['FileValidator', 'FormValidator']
+__all__ = ['FileValidator', 'FormValidator', 'compute_digest', 'file_digest']
@@ -0,0 +1,158 @@
+"""
+Compact chunk storage for GovGrant Assist
+Holds a document's chunks as offsets into one shared text buffer, with
+per-chunk fields in typed arrays, instead of one Document (a text copy plus a
+metadata dict) per chunk. Documents are only built when looked up, i.e. when
+a retrieved chunk is about to go into a prompt.
+
+ChunkStore is a LangChain docstore, so it plugs straight into the FAISS
+vector store in place of InMemoryDocstore.
+"""
+import sys
+from array import array
+from typing import Dict, List, Optional, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+class ChunkStore(Docstore, AddableMixin):
+    """
+    Docstore over one shared text buffer
+    Row i of the arrays describes one chunk; text is buffer[start:end]
+    """
+
+    def __init__(self, text: str = "", source: str = ""):
+        """
+        Initialize store
+
+        Args:
+            text: Full document text the chunks were split from
+            source: Filename reported in every chunk's metadata
+        """
+        self.text = text
+        self.source = source
+        self.total_chunks = 0
+        self.section_titles: Dict[int, str] = {}
+
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._starts = array("q")
+        self._ends = array("q")
+        self._pages = array("l")
+        self._sections = array("l")
+        self._chunk_numbers = array("l")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _locate(self, content: str) -> int:
+        """Offset of content in the buffer, appending it if absent"""
+        # Chunks arrive in document order, so search from the previous start
+        hint = self._starts[-1] if self._starts else 0
+        start = self.text.find(content, hint)
+        if start < 0:
+            start = self.text.find(content)
+        if start < 0:
+            start = len(self.text)
+            self.text += content
+        return start
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        Add documents; ids already held are left unchanged
+
+        Callers may register chunks (in document order) before their vectors
+        are added, so the vector store's own add is then a no-op here.
+
+        Args:
+            texts: Mapping of id -> Document
+        """
+        for doc_id, doc in texts.items():
+            if doc_id in self._rows:
+                continue
+
+            metadata = doc.metadata
+            start = self._locate(doc.page_content)
+            section_id = metadata.get("section_id", -1)
+            if section_id >= 0:
+                self.section_titles[section_id] = metadata.get("section", "")
+            self.source = self.source or metadata.get("source", "")
+            self.total_chunks = metadata.get("total_chunks", self.total_chunks)
+
+            self._rows[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+            self._starts.append(start)
+            self._ends.append(start + len(doc.page_content))
+            self._pages.append(metadata.get("page", 1))
+            self._sections.append(section_id)
+            self._chunk_numbers.append(metadata.get("chunk_id", len(self._ids) - 1))
+
+    def delete(self, ids: List) -> None:
+        """Forget chunks by id; unknown ids are ignored"""
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is not None:
+                self._ids[row] = None
+
+    def _document(self, row: int) -> Document:
+        metadata = {
+            "chunk_id": self._chunk_numbers[row],
+            "source": self.source,
+            "page": self._pages[row],
+            "total_chunks": self.total_chunks,
+        }
+        section_id = self._sections[row]
+        if section_id >= 0:
+            metadata["section_id"] = section_id
+            metadata["section"] = self.section_titles.get(section_id, "")
+
+        return Document(
+            id=self._ids[row],
+            page_content=self.text[self._starts[row]:self._ends[row]],
+            metadata=metadata
+        )
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Materialize a chunk by id
+
+        Args:
+            search: Docstore id
+
+        Returns:
+            Document if found, else an error message (as InMemoryDocstore does)
+        """
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self._document(row)
+
+    def documents(self) -> List[Document]:
+        """Materialize every chunk, in the order they were added"""
+        return [self._document(row) for row, doc_id in enumerate(self._ids) if doc_id is not None]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the text buffer, offsets and ids"""
+        arrays = (self._starts, self._ends, self._pages, self._sections, self._chunk_numbers)
+        return (
+            sys.getsizeof(self.text)
+            + sum(values.itemsize * len(values) for values in arrays)
+            + sys.getsizeof(self._ids)
+            + sys.getsizeof(self._rows)
+            + sum(sys.getsizeof(doc_id) for doc_id in self._rows)
+        )
+
+    def copy(self) -> "ChunkStore":
+        """Independent store sharing the (immutable) text buffer"""
+        other = ChunkStore(self.text, self.source)
+        other.total_chunks = self.total_chunks
+        other.section_titles = dict(self.section_titles)
+        other._ids = list(self._ids)
+        other._rows = dict(self._rows)
+        other._starts = array("q", self._starts)
+        other._ends = array("q", self._ends)
+        other._pages = array("l", self._pages)
+        other._sections = array("l", self._sections)
+        other._chunk_numbers = array("l", self._chunk_numbers)
+        return other
@@ -0,0 +1,31 @@
+"""
+Content digests for GovGrant Assist
+Documents are addressed by the SHA-256 of their bytes so identical uploads
+resolve to the same ingested artifact regardless of filename
+"""
+import hashlib
+
+_READ_BLOCK = 1024 * 1024
+
+
+def compute_digest(data: bytes) -> str:
+    """Return the hex SHA-256 digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(file_buffer) -> str:
+    """
+    Return the hex SHA-256 digest of a file-like object
+
+    Args:
+        file_buffer: Binary file buffer (e.g. Streamlit UploadedFile)
+
+    Returns:
+        Hex digest; the buffer is rewound to the start afterwards
+    """
+    digest = hashlib.sha256()
+    file_buffer.seek(0)
+    for block in iter(lambda: file_buffer.read(_READ_BLOCK), b""):
+        digest.update(block)
+    file_buffer.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,194 @@
+"""
+Admission control for provider calls in GovGrant Assist
+Process-wide token buckets budget requests and tokens per provider/model.
+Calls over budget wait in a fair queue: sessions take turns round-robin, so
+one busy session cannot starve the others, and no call waits longer than
+its max_wait before failing with RateLimitTimeout.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+
+DEFAULT_SESSION = "default"
+
+# Identifies the session a provider call is made for; set with session_scope()
+current_session: contextvars.ContextVar = contextvars.ContextVar(
+    "current_session", default=DEFAULT_SESSION
+)
+
+
+@contextlib.contextmanager
+def session_scope(session_id: Optional[str]):
+    """Attribute provider calls made inside the block to session_id"""
+    token = current_session.set(session_id or DEFAULT_SESSION)
+    try:
+        yield
+    finally:
+        try:
+            current_session.reset(token)
+        except ValueError:
+            pass  # Generator closed from another context; nothing to restore
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than allowed for provider budget"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` units per second"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        self._refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+
+class _Waiter:
+    __slots__ = ("session_id", "tokens")
+
+    def __init__(self, session_id: str, tokens: float):
+        self.session_id = session_id
+        self.tokens = tokens
+
+
+class AdmissionController:
+    """
+    Request and token budget for one provider/model with fair queuing
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_wait: float):
+        """
+        Initialize controller
+
+        Args:
+            requests_per_minute: Request budget (burst up to one minute's worth)
+            tokens_per_minute: Token budget (burst up to one minute's worth)
+            max_wait: Longest a call may queue before RateLimitTimeout
+        """
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        # Session -> its waiters in arrival order; dict order is the rotation
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.admitted = 0
+        self.timeouts = 0
+
+    def queue_depth(self) -> int:
+        """Number of calls currently waiting for budget"""
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def _head(self) -> Optional[_Waiter]:
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _remove(self, waiter: _Waiter, served: bool):
+        """Dequeue a waiter; a served session moves to the back of the rotation"""
+        queue = self._queues[waiter.session_id]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[waiter.session_id]
+        elif served:
+            self._queues.move_to_end(waiter.session_id)
+
+    def acquire(self, tokens: float, session_id: Optional[str] = None):
+        """
+        Block until the call fits the budget and it is this session's turn
+
+        Args:
+            tokens: Estimated tokens the call will consume
+            session_id: Caller's session (defaults to the current session scope)
+
+        Raises:
+            RateLimitTimeout: If budget did not free up within max_wait
+        """
+        session_id = session_id or current_session.get()
+        tokens = min(tokens, self.tokens.capacity)
+        waiter = _Waiter(session_id, tokens)
+        deadline = time.monotonic() + self.max_wait
+
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(waiter)
+
+            while True:
+                delay = None
+                if self._head() is waiter:
+                    delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if delay == 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self._remove(waiter, served=True)
+                        self.admitted += 1
+                        self._cond.notify_all()
+                        return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(waiter, served=False)
+                    self.timeouts += 1
+                    self._cond.notify_all()
+                    raise RateLimitTimeout(
+                        f"Provider is busy: no capacity within {self.max_wait:g}s. Please try again shortly."
+                    )
+
+                self._cond.wait(min(remaining, delay) if delay is not None else remaining)
+
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(
+    key: str,
+    requests_per_minute: float,
+    tokens_per_minute: float,
+    max_wait: float
+) -> AdmissionController:
+    """
+    Return the process-wide controller for a provider/model key
+
+    Args:
+        key: e.g. "openai/gpt-4o-mini"
+        requests_per_minute: Request budget used if the controller is new
+        tokens_per_minute: Token budget used if the controller is new
+        max_wait: Queueing limit used if the controller is new
+    """
+    with _controllers_lock:
+        if key not in _controllers:
+            _controllers[key] = AdmissionController(requests_per_minute, tokens_per_minute, max_wait)
+        return _controllers[key]
+
+
+def queue_depths() -> Dict[str, int]:
+    """Current queue depth for every provider/model key"""
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {key: controller.queue_depth() for key, controller in controllers.items()}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) for budgeting"""
+    return max(1, len(text) // 4)
@@ -0,0 +1,121 @@
+"""
+Section detection for GovGrant Assist
+Splits a document into page-range sections for the hierarchical index, using
+the PDF outline when present, detected headings otherwise, and fixed page
+windows as a last resort
+"""
+import re
+from typing import Dict, List, Tuple
+
+
+# "3. Eligibility", "3 Eligibility", "Section 3: Eligibility", "PART II ..."
+_NUMBERED_HEADING = re.compile(
+    r"^(?:(?:section|part|chapter)\s+[\divxlc]+[:.\s-]+|\d{1,2}\.?\s+)[A-Z][^\n]{2,80}$",
+    re.IGNORECASE
+)
+# Short all-caps lines such as "ELIGIBILITY CRITERIA"
+_CAPS_HEADING = re.compile(r"^[A-Z][A-Z0-9&,'()\- ]{3,60}$")
+
+
+def extract_outline(pdf_reader, max_depth: int = 2) -> List[Tuple[str, int]]:
+    """
+    Read (title, page_number) entries from a PDF's outline/bookmarks
+
+    Args:
+        pdf_reader: pypdf.PdfReader
+        max_depth: Outline levels to include (1 = top level only)
+
+    Returns:
+        Entries sorted by page (1-based page numbers); empty if no outline
+    """
+    entries = []
+
+    def walk(items, depth):
+        for item in items:
+            if isinstance(item, list):
+                if depth + 1 < max_depth:
+                    walk(item, depth + 1)
+                continue
+            try:
+                page = pdf_reader.get_destination_page_number(item) + 1
+            except Exception:
+                continue
+            if page > 0:
+                entries.append((str(item.title).strip(), page))
+
+    try:
+        walk(pdf_reader.outline, 0)
+    except Exception:
+        return []
+
+    return sorted(entries, key=lambda entry: entry[1])
+
+
+def detect_headings(page_infos: List[Dict], lines_per_page: int = 6) -> List[Tuple[str, int]]:
+    """
+    Find likely section headings near the top of each page
+
+    Args:
+        page_infos: [{"page": n, "text": ...}] as produced by RAGEngine
+        lines_per_page: Lines at the top of each page to inspect
+
+    Returns:
+        (title, page_number) entries, at most one per page
+    """
+    headings = []
+    for page_info in page_infos:
+        lines = [line.strip() for line in page_info["text"].splitlines() if line.strip()]
+        for line in lines[:lines_per_page]:
+            if _NUMBERED_HEADING.match(line) or (
+                _CAPS_HEADING.match(line) and 1 < len(line.split()) <= 8
+            ):
+                headings.append((line, page_info["page"]))
+                break
+    return headings
+
+
+def build_sections(
+    starts: List[Tuple[str, int]],
+    total_pages: int,
+    window: int
+) -> List[Dict]:
+    """
+    Turn section start points into contiguous page ranges
+
+    Sections longer than two windows are split into window-sized parts, and
+    when there are fewer than two starts the document is split into windows.
+
+    Args:
+        starts: (title, start_page) entries sorted by page
+        total_pages: Number of pages in the document
+        window: Page window used for fallback and for splitting long sections
+
+    Returns:
+        List of {"title", "start_page", "end_page"} dicts covering every page
+    """
+    # Keep the first start on each page, and make sure page 1 is covered
+    deduped = []
+    for title, page in starts:
+        if 1 <= page <= total_pages and (not deduped or page > deduped[-1][1]):
+            deduped.append((title, page))
+
+    if len(deduped) < 2:
+        deduped = [(f"Pages {page}-{min(page + window - 1, total_pages)}", page)
+                   for page in range(1, total_pages + 1, window)]
+    elif deduped[0][1] > 1:
+        deduped.insert(0, ("Front Matter", 1))
+
+    sections = []
+    for i, (title, start) in enumerate(deduped):
+        end = deduped[i + 1][1] - 1 if i + 1 < len(deduped) else total_pages
+        if end - start + 1 > 2 * window:
+            for part, part_start in enumerate(range(start, end + 1, window), start=1):
+                sections.append({
+                    "title": f"{title} (part {part})",
+                    "start_page": part_start,
+                    "end_page": min(part_start + window - 1, end),
+                })
+        else:
+            sections.append({"title": title, "start_page": start, "end_page": end})
+
+    return sections
@@ -0,0 +1,71 @@
+"""
+Index shard worker for GovGrant Assist
+Runs in its own process, holding one FAISS shard of the document library and
+answering add/search/remove requests sent over a multiprocessing pipe.
+Imports only numpy and faiss so worker processes start quickly.
+
+Requests are (request_id, operation, payload) tuples; every request gets a
+(request_id, "ok" | "error", result) reply.
+"""
+import faiss
+import numpy as np
+
+
+def serve(conn):
+    """
+    Serve shard requests until "stop" is received or the pipe closes
+
+    Args:
+        conn: Child end of a multiprocessing Pipe
+    """
+    # Shards run side by side; one search thread each avoids oversubscription
+    faiss.omp_set_num_threads(1)
+
+    index = None
+    records = []  # (document_id, text, metadata) for each row of the index
+
+    while True:
+        try:
+            request_id, operation, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        try:
+            if operation == "add":
+                vectors, new_records = payload
+                if index is None:
+                    index = faiss.IndexFlatL2(vectors.shape[1])
+                index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+                records.extend(new_records)
+                result = index.ntotal
+
+            elif operation == "search":
+                vector, k = payload
+                result = []
+                if index is not None and index.ntotal:
+                    distances, ids = index.search(vector, min(k, index.ntotal))
+                    result = [
+                        (float(distance), records[row])
+                        for distance, row in zip(distances[0], ids[0]) if row >= 0
+                    ]
+
+            elif operation == "remove":
+                removed = np.array([record[0] == payload for record in records], dtype=bool)
+                if removed.any():
+                    index.remove_ids(np.flatnonzero(removed).astype(np.int64))
+                    records = [record for record, gone in zip(records, removed) if not gone]
+                result = index.ntotal if index is not None else 0
+
+            elif operation == "ping":
+                result = index.ntotal if index is not None else 0
+
+            elif operation == "stop":
+                conn.send((request_id, "ok", None))
+                break
+
+            else:
+                raise ValueError(f"Unknown shard operation: {operation}")
+
+            conn.send((request_id, "ok", result))
+        except Exception as e:
+            conn.send((request_id, "error", str(e)))
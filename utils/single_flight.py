@@ -0,0 +1,92 @@
+"""
+Single-flight request coalescing for GovGrant Assist
+Concurrent calls with the same fingerprint share one upstream request: the
+first caller executes it, later callers block until it finishes and receive
+the same result (or exception). Results are shared objects, so callers must
+treat them as read-only.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict
+
+
+def fingerprint(*parts) -> str:
+    """
+    Build a stable key from JSON-serialisable request parts
+
+    Args:
+        *parts: Model name, messages, parameters, ...
+
+    Returns:
+        Hex SHA-256 of the canonical JSON encoding
+    """
+    encoded = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls across threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.coalesced = 0  # Calls answered by another caller's request
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() unless an identical call is already in flight
+
+        Args:
+            key: Request fingerprint
+            fn: Zero-argument callable performing the upstream request
+
+        Returns:
+            fn()'s result, possibly produced for another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """Number of distinct upstream requests currently running"""
+        with self._lock:
+            return len(self._calls)
+
+
+# Process-wide group shared by every LLMService and RAGEngine
+shared_flight = SingleFlight()
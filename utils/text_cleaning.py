@@ -0,0 +1,207 @@
+"""
+Pre-embedding text cleanup for GovGrant Assist
+Removes running headers/footers repeated across pages and drops exact and
+near-duplicate chunks (MinHash with LSH banding) so they are not embedded
+"""
+import hashlib
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+import numpy as np
+
+
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+_MERSENNE_PRIME = (1 << 31) - 1
+_PRIME = np.uint64(_MERSENNE_PRIME)
+
+
+def _normalize_line(line: str) -> str:
+    """Collapse whitespace and mask digits, so page counters compare equal"""
+    return _DIGITS.sub("#", _WHITESPACE.sub(" ", line.strip().lower()))
+
+
+def strip_repeated_lines(
+    page_texts: List[str],
+    min_page_fraction: float = 0.5,
+    edge_lines: int = 2
+) -> Tuple[List[str], int]:
+    """
+    Remove running headers, footers and page numbers
+
+    A line is boilerplate if it sits within the first or last `edge_lines`
+    lines of a page and (after normalisation) appears at the edge of at
+    least `min_page_fraction` of all pages. A line that is only a number
+    (e.g. "12", "Page 3 of 10") is removed only if the exact line repeats
+    that often, or if its number rises with the page like a page counter;
+    a lone figure such as a grant amount or a year is kept.
+
+    Args:
+        page_texts: Text of each page, in order
+        min_page_fraction: Share of pages a line must repeat on
+        edge_lines: How many lines at the top and bottom of a page to inspect
+
+    Returns:
+        Tuple of (cleaned_page_texts, removed_line_count)
+    """
+    def edge_indexes(lines: List[str]) -> set:
+        return set(range(min(edge_lines, len(lines)))) | set(range(max(0, len(lines) - edge_lines), len(lines)))
+
+    def page_counter(line: str) -> int:
+        return int(_DIGITS.search(line).group())
+
+    split_pages = [text.splitlines() for text in page_texts]
+
+    # Count on how many pages each edge line occurs. Text lines are compared
+    # with digits masked (so "Guide 2024 - p. 3" matches across pages); number
+    # lines are compared exactly, and by offset from the page index so a
+    # counter that goes up one per page is recognised
+    counts = Counter()
+    number_counts = Counter()
+    offsets = Counter()
+    for page_index, lines in enumerate(split_pages):
+        texts, numbers, page_offsets = set(), set(), set()
+        for i in edge_indexes(lines):
+            stripped = lines[i].strip()
+            if not stripped:
+                continue
+            if _PAGE_NUMBER.match(stripped):
+                numbers.add(_WHITESPACE.sub(" ", stripped.lower()))
+                page_offsets.add(page_counter(stripped) - page_index)
+            else:
+                texts.add(_normalize_line(stripped))
+        counts.update(texts)
+        number_counts.update(numbers)
+        offsets.update(page_offsets)
+
+    min_pages = max(3, int(min_page_fraction * len(page_texts) + 0.5))
+    repeated = {line for line, count in counts.items() if count >= min_pages}
+    repeated_numbers = {line for line, count in number_counts.items() if count >= min_pages}
+    counter_offsets = {offset for offset, count in offsets.items() if count >= min_pages}
+
+    cleaned = []
+    removed = 0
+    for page_index, lines in enumerate(split_pages):
+        edges = edge_indexes(lines)
+        kept = []
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if i in edges and stripped:
+                if _PAGE_NUMBER.match(stripped):
+                    boilerplate = (
+                        _WHITESPACE.sub(" ", stripped.lower()) in repeated_numbers
+                        or page_counter(stripped) - page_index in counter_offsets
+                    )
+                else:
+                    boilerplate = _normalize_line(stripped) in repeated
+                if boilerplate:
+                    removed += 1
+                    continue
+            kept.append(line)
+        cleaned.append("\n".join(kept))
+
+    return cleaned, removed
+
+
+class MinHashDeduplicator:
+    """
+    Finds exact and near-duplicate texts
+    Near-duplicates are detected with MinHash signatures over word shingles,
+    bucketed with LSH bands so only likely pairs are compared. Texts that
+    differ in any number (amounts, dates, deadlines) are never near-duplicates,
+    however similar their wording
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        """
+        Initialize deduplicator
+
+        Args:
+            threshold: Estimated Jaccard similarity at or above which texts are duplicates
+            num_perm: Number of MinHash permutations (signature length)
+            bands: LSH bands; num_perm must be divisible by it
+            shingle_size: Words per shingle
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Fixed seed keeps signatures (and therefore results) deterministic
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def _signature(self, text: str) -> np.ndarray:
+        words = _WHITESPACE.sub(" ", text.lower()).split()
+        if len(words) < self.shingle_size:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {
+                " ".join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            }
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & _MERSENNE_PRIME for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        # (a * x + b) mod p for every permutation/shingle pair, min per permutation
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def find_duplicates(self, texts: List[str]) -> List[int]:
+        """
+        Identify texts that duplicate an earlier text
+
+        Args:
+            texts: Texts in order; the first occurrence is always kept
+
+        Returns:
+            Sorted indexes of texts to drop
+        """
+        duplicates = []
+        seen_exact = set()
+        signatures = {}
+        numbers = {}
+        buckets = defaultdict(list)
+
+        for index, text in enumerate(texts):
+            normalized = _WHITESPACE.sub(" ", text.strip().lower())
+            digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+            if digest in seen_exact:
+                duplicates.append(index)
+                continue
+            seen_exact.add(digest)
+
+            signature = self._signature(normalized)
+            band_keys = [
+                (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+
+            text_numbers = frozenset(_DIGITS.findall(normalized))
+
+            candidates = {other for key in band_keys for other in buckets.get(key, ())}
+            if any(
+                numbers[other] == text_numbers
+                and np.mean(signatures[other] == signature) >= self.threshold
+                for other in candidates
+            ):
+                duplicates.append(index)
+                continue
+
+            signatures[index] = signature
+            numbers[index] = text_numbers
+            for key in band_keys:
+                buckets[key].append(index)
+
+        return duplicates
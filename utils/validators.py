@@ -3,7 +3,7 @@ Validation utilities for GovGrant Assist
 Implements all validation rules from PRD Section 2.2
 """
 import re
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import pypdf
 
 
@@ -117,3 +117,28 @@ class FormValidator:
             return True, None
         except (ValueError, TypeError):
             return False, "Budget must be a valid number."
+
+    @classmethod
+    def validate_proposal_form(
+        cls,
+        company_name: str,
+        project_title: str,
+        core_solution: str,
+        requested_budget: Optional[float] = None
+    ) -> List[str]:
+        """
+        Run every proposal form check
+
+        Returns:
+            List of error messages (empty if all fields are valid)
+        """
+        errors = []
+        for is_valid, msg in (
+            cls.validate_company_name(company_name),
+            cls.validate_project_title(project_title),
+            cls.validate_core_solution(core_solution),
+            cls.validate_budget(requested_budget),
+        ):
+            if not is_valid:
+                errors.append(msg)
+        return errors